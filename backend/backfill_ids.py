@@ -0,0 +1,28 @@
+"""
+Migration giving legacy documents an application id
+
+Documents written before ids were stored on insert only have _id. This
+stores id = str(_id), the value the API already exposed for them, in every
+collection. Startup runs it once and records it in the migrations
+collection; this script runs it again regardless, for documents written
+by older instances since.
+
+Usage: python backfill_ids.py
+"""
+import asyncio
+import logging
+
+from database import connect_to_mongo, close_mongo_connection, backfill_ids, run_migration
+
+logger = logging.getLogger(__name__)
+
+async def main():
+    await connect_to_mongo()
+    try:
+        await run_migration("backfill_ids", backfill_ids, force=True)
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+In-process TTL + LRU cache for rarely changing catalog reads
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+import os
+import threading
+import time
+
+class TTLCache:
+    """Least-recently-used cache whose entries also expire after a TTL.
+
+    Every entry carries a set of tags (usually collection names) so that a
+    write to a collection can drop all entries derived from it.
+    """
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, frozenset]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return cached value or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = (), ttl: Optional[float] = None):
+        """Store value under key, evicting the least recently used entries"""
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every entry carrying the tag, return the number dropped"""
+        with self._lock:
+            stale = [key for key, (_, _, tags) in self._entries.items() if tag in tags]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+            return len(stale)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+# Shared cache instance used by the CRUD layer
+catalog_cache = TTLCache(
+    max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", 1024)),
+    default_ttl=float(os.environ.get("CACHE_TTL_SECONDS", 60)),
+)
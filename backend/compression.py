@@ -0,0 +1,156 @@
+"""
+gzip / brotli response compression
+
+CompressionMiddleware compresses responses above a minimum size. Streamed
+bodies, including every response passed through a BaseHTTPMiddleware, are
+buffered up to that size and then compressed chunk by chunk. It also
+publishes the negotiated encoding in a context variable so routes
+serving cached payloads can return bytes compressed once per cache entry
+instead of on every request; such responses already carry Content-Encoding
+and are passed through untouched.
+"""
+from contextvars import ContextVar
+from typing import Optional
+import gzip
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 500))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+
+# Encoding chosen for the current request, None when the client accepts none
+accepted_encoding: ContextVar[Optional[str]] = ContextVar("accepted_encoding", default=None)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br over gzip from an Accept-Encoding header"""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class StreamCompressor:
+    """Incremental gzip or brotli compressor for chunked bodies"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 31 writes the gzip header and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+class CompressionMiddleware:
+    """Compress responses of at least minimum_size bytes, streamed or not"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        token = accepted_encoding.set(encoding)
+        try:
+            if encoding is None:
+                await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, self._compressing_send(send, encoding))
+        finally:
+            accepted_encoding.reset(token)
+
+    def _compressing_send(self, send, encoding: str):
+        start_message = None
+        passthrough = False
+        compressor: Optional[StreamCompressor] = None
+        buffered = []
+        buffered_size = 0
+
+        async def wrapped_send(message):
+            nonlocal start_message, passthrough, compressor, buffered_size
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            more_body = message.get("more_body", False)
+            if compressor is not None:
+                chunk = compressor.compress(message.get("body", b""))
+                if not more_body:
+                    chunk += compressor.finish()
+                if chunk or not more_body:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            buffered.append(message.get("body", b""))
+            buffered_size += len(buffered[-1])
+            if more_body and buffered_size < self.minimum_size:
+                # Wait for enough of the stream to know whether it is worth compressing
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = b"".join(buffered)
+            buffered.clear()
+            if "content-encoding" in headers or buffered_size < self.minimum_size:
+                # Already compressed or too small to be worth it
+                passthrough = True
+                if "content-encoding" in headers and "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                compressed = compress(body, encoding)
+                headers["Content-Length"] = str(len(compressed))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": compressed})
+                return
+
+            # The final length is unknown until the stream ends
+            del headers["Content-Length"]
+            compressor = StreamCompressor(encoding)
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressor.compress(body), "more_body": True})
+
+        return wrapped_send
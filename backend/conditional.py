@@ -0,0 +1,98 @@
+"""
+HTTP conditional requests for catalog routes
+
+Validators come from the collection version (latest updated_at and document
+count) rather than the response body, so a matching If-None-Match or
+If-Modified-Since is answered with 304 before the route runs and nothing is
+read or serialized. Paths under a rule that serve live counters rather than
+the collection (live_suffixes) get Cache-Control: no-store and no validators.
+"""
+from typing import List, Optional, Sequence, Tuple
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import logging
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# (path prefix, CRUD instances the response depends on, Cache-Control value)
+ConditionalRule = Tuple[str, Sequence, str]
+
+async def collection_validators(cruds: Sequence) -> Tuple[str, Optional[datetime]]:
+    """Weak ETag and Last-Modified for the combined state of the collections"""
+    parts = []
+    last_modified = None
+    for crud in cruds:
+        version = await crud.get_version()
+        updated_at = version["updated_at"]
+        stamp = int(updated_at.replace(tzinfo=timezone.utc).timestamp() * 1000) if updated_at else 0
+        parts.append(f"{crud.collection_name}-{stamp}-{version['count']}")
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    etag = f'W/"{".".join(parts)}"'
+    return etag, last_modified.replace(tzinfo=timezone.utc) if last_modified else None
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison: W/"x" matches "x"
+        return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+class ConditionalRequestMiddleware(BaseHTTPMiddleware):
+    """Emit validators and Cache-Control for GET routes, answer 304 when unchanged"""
+
+    def __init__(self, app, rules: List[ConditionalRule], live_suffixes: Sequence[str] = ()):
+        super().__init__(app)
+        self.rules = rules
+        self.live_suffixes = tuple(live_suffixes)
+
+    def match(self, path: str) -> Optional[ConditionalRule]:
+        for rule in self.rules:
+            if path == rule[0] or path.startswith(rule[0] + "/"):
+                return rule
+        return None
+
+    async def dispatch(self, request: Request, call_next):
+        rule = self.match(request.url.path) if request.method in ("GET", "HEAD") else None
+        if rule is None:
+            return await call_next(request)
+
+        if self.live_suffixes and request.url.path.endswith(self.live_suffixes):
+            response = await call_next(request)
+            response.headers["Cache-Control"] = "no-store"
+            return response
+
+        _, cruds, cache_control = rule
+        try:
+            etag, last_modified = await collection_validators(cruds)
+        except Exception as e:
+            logger.warning(f"Could not compute validators for {request.url.path}: {e}")
+            return await call_next(request)
+
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if last_modified:
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+        if is_not_modified(request, etag, last_modified):
+            return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers.update(headers)
+        return response
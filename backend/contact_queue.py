@@ -0,0 +1,211 @@
+"""
+Buffered writes for contact form submissions
+
+The contact form is the main spam target. Submissions are rate limited per
+client IP with a token bucket before any database work, then queued in
+memory and written with insert_many in batches, flushed when a batch fills
+up or after a short interval, so bursts cost a handful of round trips
+instead of one write per message. A batch that fails is retried with
+backoff; while it does, new messages are written directly so clients see
+the error instead of a success for a message that may never be stored.
+"""
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import time
+
+from fastapi import Request
+
+from database import contacts_crud
+
+logger = logging.getLogger(__name__)
+
+CONTACT_RATE_PER_MINUTE = float(os.environ.get("CONTACT_RATE_PER_MINUTE", 5))
+CONTACT_RATE_BURST = float(os.environ.get("CONTACT_RATE_BURST", 3))
+CONTACT_QUEUE_MAX = int(os.environ.get("CONTACT_QUEUE_MAX", 5000))
+CONTACT_BATCH_SIZE = int(os.environ.get("CONTACT_BATCH_SIZE", 100))
+CONTACT_FLUSH_SECONDS = float(os.environ.get("CONTACT_FLUSH_SECONDS", 0.5))
+CONTACT_RETRY_SECONDS = float(os.environ.get("CONTACT_RETRY_SECONDS", 1))
+CONTACT_MAX_RETRY_SECONDS = float(os.environ.get("CONTACT_MAX_RETRY_SECONDS", 30))
+# Attempts per batch once shutting down, after which messages are logged in full
+CONTACT_STOP_ATTEMPTS = int(os.environ.get("CONTACT_STOP_ATTEMPTS", 3))
+TRUST_PROXY_HEADERS = os.environ.get("TRUST_PROXY_HEADERS", "false").lower() in ("1", "true", "yes")
+
+def client_ip(request: Request) -> str:
+    """Client address, taken from X-Forwarded-For only when the proxy is trusted"""
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+class TokenBucketLimiter:
+    """Per-key token buckets refilled at rate tokens per second up to burst"""
+
+    def __init__(self, rate_per_minute: float, burst: float, max_keys: int = 10000):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.rejected = 0
+
+    def allow(self, key: str) -> bool:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return True
+
+    def retry_after(self, key: str) -> int:
+        """Seconds until key has a token again"""
+        tokens, _ = self._buckets.get(key, (self.burst, 0))
+        return max(1, int((1 - tokens) / self.rate + 0.999)) if self.rate else 60
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely carry no state worth keeping
+        full_after = self.burst / self.rate if self.rate else float("inf")
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < full_after
+        }
+
+_STOP = object()
+
+class ContactQueue:
+    """In-memory queue of contact messages flushed to Mongo in batches"""
+
+    def __init__(self, max_size: int = CONTACT_QUEUE_MAX, batch_size: int = CONTACT_BATCH_SIZE,
+                 flush_interval: float = CONTACT_FLUSH_SECONDS):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.rejected = 0
+        self.retries = 0
+        self.failing = False
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._stopping = False
+        self.failing = False
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still queued"""
+        self._stopping = True
+        if self._task:
+            # Queued behind pending messages, so everything before it is written
+            await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+        while self._queue and not self._queue.empty():
+            await self.flush(self._take(self.batch_size))
+
+    def submit(self, doc: dict) -> bool:
+        """Queue a message, False when the queue is full"""
+        try:
+            self._queue.put_nowait(doc)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def run(self):
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+            # Give a burst the flush interval to fill the batch
+            if self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.flush_interval)
+            batch = [first] + self._take(self.batch_size - 1)
+            stopping = any(doc is _STOP for doc in batch)
+            if stopping:
+                batch = [doc for doc in batch if doc is not _STOP]
+            await self.flush(batch)
+            if stopping:
+                return
+
+    def _take(self, count: int) -> List[dict]:
+        batch = []
+        while len(batch) < count and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def flush(self, batch: List[dict]):
+        """Write a batch, retrying with backoff until it is stored.
+        
+        Retries are unbounded while running and CONTACT_STOP_ATTEMPTS once
+        stopping; messages still unwritten then are logged in full.
+        """
+        if not batch:
+            return
+        attempt = 0
+        while True:
+            try:
+                created, errors = await contacts_crud.create_many(batch)
+                break
+            except Exception as e:
+                attempt += 1
+                self.failing = True
+                logger.error(f"Error writing {len(batch)} queued contact messages, attempt {attempt}: {e}")
+                if self._stopping and attempt >= CONTACT_STOP_ATTEMPTS:
+                    self.unwritten(batch)
+                    return
+                self.retries += 1
+                await asyncio.sleep(min(CONTACT_RETRY_SECONDS * 2 ** (attempt - 1), CONTACT_MAX_RETRY_SECONDS))
+        self.failing = False
+        self.batches += 1
+        written = len(created)
+        for index, error in errors.items():
+            # A retried batch may have been stored before the error that triggered the retry
+            if "E11000" in error:
+                written += 1
+                continue
+            logger.error(f"Error writing queued contact message {index}: {error}")
+            self.unwritten([batch[index]])
+        self.written += written
+
+    def unwritten(self, docs: List[dict]):
+        """Last resort for messages that could not be stored, keep them in the log"""
+        self.failed += len(docs)
+        for doc in docs:
+            message = {key: value for key, value in doc.items() if key != "_id"}
+            logger.error(f"Contact message not stored: {json.dumps(message, default=str, ensure_ascii=False)}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "depth": self._queue.qsize() if self._queue else 0,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failing": self.failing,
+            "rejected_queue_full": self.rejected,
+            "rejected_rate_limited": contact_rate_limiter.rejected,
+        }
+
+contact_rate_limiter = TokenBucketLimiter(CONTACT_RATE_PER_MINUTE, CONTACT_RATE_BURST)
+contact_queue = ContactQueue()
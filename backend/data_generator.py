@@ -0,0 +1,283 @@
+"""
+Synthetic data generator for scale testing
+
+Produces tours, coaches, testimonials, gallery items, bookings and contact
+messages at a configurable scale. Bookings reference existing and generated
+tours, follow a configurable status distribution and are priced from their
+tour. Active bookings fill a tour with a capacity up to it and no further,
+and seat counters are rebuilt once bookings are written. Generated tours
+have no capacity, so add some when active bookings outnumber the seats
+left on stored tours. Documents are generated lazily and written with
+unordered insert_many batches, several in flight at once, so millions of
+rows fit in memory.
+
+Usage: python data_generator.py --bookings 1000000 --contacts 200000 [--tours 50]
+"""
+from typing import Dict, Iterable, Iterator, List, Optional
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import logging
+import random
+import time
+import uuid
+
+from database import (
+    tours_crud, coaches_crud, testimonials_crud, gallery_crud,
+    bookings_crud, contacts_crud, connect_to_mongo, close_mongo_connection, projection_for
+)
+from models import BookingStatus, GalleryCategory, TourLevel
+from pricing import PRICE_FIELDS, quote, tour_price
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUS_WEIGHTS = {
+    BookingStatus.PENDING.value: 0.25,
+    BookingStatus.CONFIRMED.value: 0.6,
+    BookingStatus.CANCELLED.value: 0.15,
+}
+
+DESTINATIONS = ["Тенерифе, Испания", "Марбелья, Испания", "Майорка, Испания", "Дубай, ОАЭ", "Алгарве, Португалия"]
+HOTELS = ["Abama Hotels ★★★★★", "Ritz-Carlton ★★★★★", "Four Seasons ★★★★★", "Barceló ★★★★"]
+FEATURES = [
+    "Ежедневные тренировки", "Проживание 5★", "Культурная программа", "Профессиональные тренеры",
+    "Турнирная игра", "Видеоанализ", "Трансфер из аэропорта", "Спа-программа",
+]
+FIRST_NAMES = ["Анна", "Иван", "Мария", "Алексей", "Елена", "Дмитрий", "Ольга", "Сергей", "Наталья", "Павел"]
+LAST_NAMES = ["Иванов", "Петрова", "Смирнов", "Кузнецова", "Попов", "Соколова", "Лебедев", "Новикова"]
+COUNTRIES = ["Россия", "Испания", "Германия", "Казахстан", "ОАЭ", "Израиль", "Франция"]
+SUBJECTS = ["Вопрос о туре", "Бронирование", "Индивидуальные тренировки", "Корпоративный тур", "Другое"]
+PARTICIPANT_WEIGHTS = {1: 30, 2: 35, 3: 12, 4: 12, 5: 6, 6: 5}
+IMAGE = "https://images.unsplash.com/photo-{}?crop=entropy&cs=srgb&fm=jpg&q=85"
+
+def _created_at(days: int) -> datetime:
+    return datetime.utcnow() - timedelta(seconds=random.randint(0, days * 86400))
+
+def _timestamps(days: int) -> Dict[str, datetime]:
+    created = _created_at(days)
+    return {"created_at": created, "updated_at": created}
+
+def generate_tours(count: int, days: int) -> Iterator[dict]:
+    levels = [level.value for level in TourLevel]
+    for i in range(count):
+        start = datetime.utcnow() + timedelta(days=random.randint(7, 365))
+        end = start + timedelta(days=7)
+        base_price = random.randrange(1200, 4000, 100)
+        yield {
+            "id": str(uuid.uuid4()),
+            "title": f"Падел-тур {i + 1}",
+            "subtitle": random.choice(DESTINATIONS),
+            "dates": f"{start:%d.%m.%y} - {end:%d.%m.%y}",
+            "level": random.choice(levels),
+            "accommodation": random.choice(HOTELS),
+            "price": f"от {base_price}",
+            "base_price": float(base_price),
+            "currency": "Euro",
+            "description": "Неделя тренировок с профессиональными тренерами, игровая практика и отдых у океана.",
+            "image": IMAGE.format(1689942963385 + i),
+            "features": random.sample(FEATURES, 4),
+            "group_size": random.choice(["6-8 человек", "8-12 человек", "10-16 человек"]),
+            **_timestamps(days),
+        }
+
+def generate_coaches(count: int, days: int) -> Iterator[dict]:
+    for i in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "name": f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}",
+            "title": random.choice(["Главный тренер", "Тренер", "Тренер по физподготовке"]),
+            "experience": f"{random.randint(3, 20)} лет опыта",
+            "description": "Бывший профессиональный игрок, готовит игроков всех уровней.",
+            "image": IMAGE.format(1500000000000 + i),
+            "specializations": random.sample(["Техника", "Тактика", "Физподготовка", "Турниры", "Дети"], 2),
+            **_timestamps(days),
+        }
+
+def generate_testimonials(count: int, days: int) -> Iterator[dict]:
+    for i in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "name": f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}",
+            "role": random.choice(["Участник тура", "Любитель", "Корпоративный клиент"]),
+            "content": "Отличная организация, сильные тренеры и прекрасная атмосфера. Обязательно вернусь!",
+            "rating": random.choices([3, 4, 5], weights=[1, 3, 6])[0],
+            "image": IMAGE.format(1600000000000 + i),
+            "approved": random.random() < 0.8,
+            **_timestamps(days),
+        }
+
+def generate_gallery(count: int, days: int) -> Iterator[dict]:
+    categories = [category.value for category in GalleryCategory]
+    for i in range(count):
+        category = random.choice(categories)
+        yield {
+            "id": str(uuid.uuid4()),
+            "image": IMAGE.format(1673253408773 + i),
+            "title": f"{category.capitalize()} {i + 1}",
+            "category": category,
+            **_timestamps(days),
+        }
+
+def generate_bookings(count: int, tours: List[dict], days: int,
+                      status_weights: Dict[str, float] = DEFAULT_STATUS_WEIGHTS,
+                      seats_taken: Optional[Dict[str, int]] = None) -> Iterator[dict]:
+    """Bookings for the given tours, priced from the tour price.
+    
+    Active bookings only go to tours with seats left, shrinking a group to
+    the seats a tour has. Raises ValueError when every tour has a capacity
+    and the active bookings would not fit, rather than skew the statuses.
+    """
+    prices = {tour["id"]: tour_price(tour) for tour in tours}
+    tour_ids = list(prices)
+    seats_taken = seats_taken or {}
+    seats_left = {
+        tour["id"]: max(tour["capacity"] - seats_taken.get(tour["id"], 0), 0)
+        for tour in tours if tour.get("capacity") is not None
+    }
+    open_tours = [tour_id for tour_id in tour_ids if seats_left.get(tour_id, 1) > 0]
+    statuses = list(status_weights)
+    weights = list(status_weights.values())
+    if len(seats_left) == len(tour_ids):
+        active_share = 1 - status_weights.get(BookingStatus.CANCELLED.value, 0) / sum(weights)
+        mean_participants = sum(n * w for n, w in PARTICIPANT_WEIGHTS.items()) / sum(PARTICIPANT_WEIGHTS.values())
+        demand = count * active_share * mean_participants
+        if demand > sum(seats_left.values()):
+            raise ValueError(
+                f"About {demand:.0f} active seats requested but only {sum(seats_left.values())} left, "
+                "generate tours without a capacity with --tours"
+            )
+    for i in range(count):
+        status = random.choices(statuses, weights=weights)[0]
+        participants = random.choices(list(PARTICIPANT_WEIGHTS), weights=list(PARTICIPANT_WEIGHTS.values()))[0]
+        if status == BookingStatus.CANCELLED.value:
+            tour_id = random.choice(tour_ids)
+        elif not open_tours:
+            raise ValueError(f"Every tour is full after {i} bookings, generate tours without a capacity with --tours")
+        else:
+            tour_id = random.choice(open_tours)
+            if tour_id in seats_left:
+                participants = min(participants, seats_left[tour_id])
+                seats_left[tour_id] -= participants
+                if not seats_left[tour_id]:
+                    open_tours.remove(tour_id)
+        created = _created_at(days)
+        yield {
+            "id": str(uuid.uuid4()),
+            "tour_id": tour_id,
+            "first_name": random.choice(FIRST_NAMES),
+            "last_name": random.choice(LAST_NAMES),
+            "email": f"guest{i}.{random.randint(0, 10**6)}@example.com",
+            "phone": f"+7 9{random.randint(10, 99)} {random.randint(100, 999)} {random.randint(1000, 9999)}",
+            "country": random.choice(COUNTRIES),
+            "participants": participants,
+            "special_requests": random.choice(["", "", "", "Вегетарианское питание", "Трансфер из аэропорта"]),
+            **quote(prices[tour_id], participants, created.date()),
+            "status": status,
+            "created_at": created,
+            "updated_at": created + timedelta(hours=random.randint(0, 72)),
+        }
+
+def generate_contacts(count: int, days: int) -> Iterator[dict]:
+    for i in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "name": f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}",
+            "email": f"visitor{i}.{random.randint(0, 10**6)}@example.com",
+            "phone": random.choice([None, "+7 900 000 00 00"]),
+            "subject": random.choice(SUBJECTS),
+            "message": "Здравствуйте! Подскажите, пожалуйста, остались ли места и что входит в стоимость?",
+            "read": random.random() < 0.6,
+            **_timestamps(days),
+        }
+
+def _batches(docs: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def insert_generated(crud, docs: Iterable[dict], batch_size: int = 5000, parallel: int = 4) -> int:
+    """Write documents with at most parallel insert_many batches in flight"""
+    inserted = 0
+    pending = set()
+    for batch in _batches(docs, batch_size):
+        if len(pending) >= parallel:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            inserted += sum(len(task.result().inserted_ids) for task in done)
+        pending.add(asyncio.ensure_future(crud.collection.insert_many(batch, ordered=False)))
+    if pending:
+        done, _ = await asyncio.wait(pending)
+        inserted += sum(len(task.result().inserted_ids) for task in done)
+    crud.invalidate_cache()
+    return inserted
+
+async def generate(tours: int = 0, coaches: int = 0, testimonials: int = 0, gallery: int = 0,
+                   bookings: int = 0, contacts: int = 0, days: int = 365,
+                   batch_size: int = 5000, parallel: int = 4) -> Dict[str, int]:
+    """Generate and insert documents, return the number written per collection"""
+    report = {}
+    new_tours = list(generate_tours(tours, days))
+    for crud, docs in (
+        (tours_crud, new_tours),
+        (coaches_crud, generate_coaches(coaches, days)),
+        (testimonials_crud, generate_testimonials(testimonials, days)),
+        (gallery_crud, generate_gallery(gallery, days)),
+    ):
+        report[crud.collection_name] = await insert_generated(crud, docs, batch_size, parallel)
+
+    if bookings:
+        # Bookings may reference any tour, generated or already stored
+        stored = await tours_crud.collection.find({}, projection_for(PRICE_FIELDS + ["capacity"])).to_list(length=None)
+        if not stored:
+            raise ValueError("Bookings need at least one tour, generate some with --tours")
+        await bookings_crud.reconcile_seats()
+        seats_taken = {
+            seats["_id"]: seats.get("seats_taken", 0)
+            async for seats in bookings_crud.seats_collection.find({}, {"seats_taken": 1})
+        }
+        report["bookings"] = await insert_generated(
+            bookings_crud, generate_bookings(bookings, stored, days, seats_taken=seats_taken), batch_size, parallel
+        )
+        await bookings_crud.reconcile_stats()
+        await bookings_crud.reconcile_seats()
+    report["contacts"] = await insert_generated(contacts_crud, generate_contacts(contacts, days), batch_size, parallel)
+    return report
+
+async def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic data for scale testing")
+    parser.add_argument("--tours", type=int, default=0)
+    parser.add_argument("--coaches", type=int, default=0)
+    parser.add_argument("--testimonials", type=int, default=0)
+    parser.add_argument("--gallery", type=int, default=0)
+    parser.add_argument("--bookings", type=int, default=0)
+    parser.add_argument("--contacts", type=int, default=0)
+    parser.add_argument("--days", type=int, default=365, help="spread created_at over this many past days")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--parallel", type=int, default=4, help="insert_many batches in flight")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible data")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    await connect_to_mongo()
+    try:
+        started = time.perf_counter()
+        report = await generate(
+            tours=args.tours, coaches=args.coaches, testimonials=args.testimonials, gallery=args.gallery,
+            bookings=args.bookings, contacts=args.contacts, days=args.days,
+            batch_size=args.batch_size, parallel=args.parallel
+        )
+        for collection_name, count in report.items():
+            if count:
+                logger.info(f"Inserted {count} documents into {collection_name}")
+        logger.info(f"Done in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -4,7 +4,7 @@ Data seeder to populate the database with initial data from mock.js
 import asyncio
 from database import (
     tours_crud, coaches_crud, testimonials_crud, 
-    gallery_crud, settings_crud, connect_to_mongo
+    gallery_crud, settings_crud, connect_to_mongo, close_mongo_connection
 )
 import logging
 
@@ -20,11 +20,13 @@ TOURS_DATA = [
         "level": "начинающие-любители",
         "accommodation": "Abama Hotels ★★★★★",
         "price": "от 1900",
+        "base_price": 1900.0,
         "currency": "Euro",
         "description": "Идеально для тех, кто только открывает для себя падель. Узнайте основы техники и тактики с нашими тренерами",
         "image": "https://images.unsplash.com/photo-1689942963385-f5bd03f3b270?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwxfHxwYWRlbCUyMGNvdXJ0fGVufDB8fHx8MTc1Mjg0MjA2OXww&ixlib=rb-4.1.0&q=85",
         "features": ["Ежедневные тренировки", "Проживание 5★", "Культурная программа", "Профессиональные тренеры"],
-        "group_size": "8-12 человек"
+        "group_size": "8-12 человек",
+        "capacity": 12
     },
     {
         "id": "2",
@@ -34,11 +36,13 @@ TOURS_DATA = [
         "level": "любители-продвинутые",
         "accommodation": "Abama Hotels ★★★★★",
         "price": "от 1900",
+        "base_price": 1900.0,
         "currency": "Euro",
         "description": "Для игроков среднего уровня. Работайте над техникой, улучшайте удары и развивайте стратегическое мышление.",
         "image": "https://images.unsplash.com/photo-1673253408773-5b620b1d6b8f?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1ODB8MHwxfHNlYXJjaHwyfHxwYWRlbCUyMGNvdXJ0fGVufDB8fHx8MTc1Mjg0MjA2OXww&ixlib=rb-4.1.0&q=85",
         "features": ["Интенсивные тренировки", "Тактическое мышление", "Улучшение техники", "Турнирная игра"],
-        "group_size": "8-12 человек"
+        "group_size": "8-12 человек",
+        "capacity": 12
     },
     {
         "id": "3",
@@ -48,11 +52,13 @@ TOURS_DATA = [
         "level": "любители-продвинутые",
         "accommodation": "Без размещения",
         "price": "от 890",
+        "base_price": 890.0,
         "currency": "Euro",
         "description": "Если вы предпочитаете самостоятельно путешествовать и при этом хотите начать играть или повысить свой уровень игры с профессионалами.",
         "image": "https://images.pexels.com/photos/1103833/pexels-photo-1103833.jpeg",
         "features": ["Профессиональные тренировки", "Гибкий график", "Самостоятельное размещение", "Персональный подход"],
-        "group_size": "8-12 человек"
+        "group_size": "8-12 человек",
+        "capacity": 12
     }
 ]
 
@@ -168,47 +174,45 @@ SETTINGS_DATA = {
     }
 }
 
+SEED_DATA = [
+    (tours_crud, TOURS_DATA),
+    (coaches_crud, COACHES_DATA),
+    (testimonials_crud, TESTIMONIALS_DATA),
+    (gallery_crud, GALLERY_DATA),
+    (settings_crud, [SETTINGS_DATA]),
+]
+
+async def seed_collection(crud, docs) -> int:
+    """Seed a collection that has no documents yet"""
+    # Collection metadata count, no scan; a populated collection is left as it is
+    if await crud.collection.estimated_document_count():
+        return 0
+    return await crud.insert_missing([dict(doc) for doc in docs])
+
 async def seed_database():
-    """Seed the database with initial data"""
+    """Seed the database with initial data, expects an open connection"""
     try:
-        await connect_to_mongo()
         logger.info("Starting database seeding...")
+        seeded = await asyncio.gather(*(seed_collection(crud, docs) for crud, docs in SEED_DATA))
         
-        # Check if data already exists
-        existing_tours = await tours_crud.get_all()
-        if existing_tours:
+        if not any(seeded):
             logger.info("Database already has data, skipping seeding")
             return
-        
-        # Seed tours
-        logger.info("Seeding tours...")
-        for tour_data in TOURS_DATA:
-            await tours_crud.create(tour_data)
-        
-        # Seed coaches
-        logger.info("Seeding coaches...")
-        for coach_data in COACHES_DATA:
-            await coaches_crud.create(coach_data)
-        
-        # Seed testimonials
-        logger.info("Seeding testimonials...")
-        for testimonial_data in TESTIMONIALS_DATA:
-            await testimonials_crud.create(testimonial_data)
-        
-        # Seed gallery
-        logger.info("Seeding gallery...")
-        for gallery_data in GALLERY_DATA:
-            await gallery_crud.create(gallery_data)
-        
-        # Seed settings
-        logger.info("Seeding settings...")
-        await settings_crud.update_settings(SETTINGS_DATA)
-        
+        for (crud, _), count in zip(SEED_DATA, seeded):
+            if count:
+                logger.info(f"Seeded {count} documents into {crud.collection_name}")
         logger.info("Database seeding completed successfully!")
         
     except Exception as e:
         logger.error(f"Error seeding database: {e}")
         raise
 
+async def main():
+    await connect_to_mongo()
+    try:
+        await seed_database()
+    finally:
+        await close_mongo_connection()
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
\ No newline at end of file
+    asyncio.run(main())
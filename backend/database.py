@@ -1,8 +1,22 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional, List, Dict, Any
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReadPreference, ReturnDocument, UpdateOne
+from pymongo.read_concern import ReadConcern
+from pymongo.errors import BulkWriteError
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple, Callable
 import os
 import uuid
-from datetime import datetime
+import asyncio
+import json
+import base64
+import logging
+import time
+from datetime import datetime, timedelta
+from cache import catalog_cache
+from pool_monitor import pool_monitor
+from metrics import command_metrics
+from slow_query import slow_query_log
+
+logger = logging.getLogger(__name__)
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
@@ -12,11 +26,75 @@ class Database:
 def get_database() -> AsyncIOMotorClient:
     return Database.db
 
+# Client settings read from the environment, unset ones keep the driver defaults
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", int),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", int),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", int),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", int),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", int),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", int),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", int),
+    "compressors": ("MONGO_COMPRESSORS", str),
+    "zlibCompressionLevel": ("MONGO_ZLIB_COMPRESSION_LEVEL", int),
+}
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+def mongo_client_options() -> Dict[str, Any]:
+    """Keyword arguments for the Mongo client built from MONGO_* variables"""
+    options = {}
+    for option, (variable, cast) in MONGO_CLIENT_OPTIONS.items():
+        value = os.environ.get(variable)
+        if value:
+            options[option] = cast(value)
+    return options
+
+def read_preference_from_env(variable: str, default: Optional[str] = None):
+    """Read preference named by variable, None leaves the client's in place"""
+    name = os.environ.get(variable, default)
+    if name is None:
+        return None
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"{variable} must be one of {', '.join(READ_PREFERENCES)}")
+    return READ_PREFERENCES[name]
+
+# One document per completed migration, so startup runs each of them once
+MIGRATIONS_COLLECTION = "migrations"
+
+# Seconds after a write during which a collection's reads go to the primary
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("MONGO_READ_YOUR_WRITES_SECONDS", 5))
+
 async def connect_to_mongo():
     """Create database connection"""
-    Database.client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    Database.client = AsyncIOMotorClient(
+        os.environ['MONGO_URL'],
+        event_listeners=[pool_monitor, command_metrics, slow_query_log],
+        **mongo_client_options()
+    )
+    slow_query_log.bind(Database.client, asyncio.get_running_loop())
     Database.db = Database.client[os.environ['DB_NAME']]
     print("Connected to MongoDB")
+    
+    await run_migration("backfill_ids", backfill_ids)
+    
+    report = await ensure_indexes()
+    for collection_name, created in report.items():
+        if created:
+            logger.info(f"Created indexes on {collection_name}: {', '.join(created)}")
+    if not any(report.values()):
+        logger.info("All collection indexes already in place")
+
+def supports_transactions() -> bool:
+    """Multi-document transactions need a replica set or sharded cluster"""
+    topology = getattr(Database.client, "topology_description", None)
+    return getattr(topology, "topology_type_name", None) in ("ReplicaSetWithPrimary", "Sharded")
 
 async def close_mongo_connection():
     """Close database connection"""
@@ -24,152 +102,885 @@ async def close_mongo_connection():
         Database.client.close()
         print("Disconnected from MongoDB")
 
+def without_id(doc: dict) -> dict:
+    """Document fields other than the id it is matched on"""
+    return {key: value for key, value in doc.items() if key != "id"}
+
+# Documents are identified by the application `id` field, Mongo's _id never
+# leaves the database
+def projection_for(fields: Optional[List[str]] = None) -> Dict[str, int]:
+    """Mongo projection for the given fields (all when None), always without _id"""
+    projection = {field: 1 for field in fields} if fields else {}
+    projection["_id"] = 0
+    return projection
+
+# Keyset pagination cursors
+def encode_cursor(created_at: datetime, last_id: str) -> str:
+    """Build an opaque cursor pointing after the given document"""
+    payload = json.dumps([created_at.isoformat(), last_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """Parse a cursor produced by encode_cursor, raise ValueError if malformed"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, last_id = json.loads(payload)
+        return datetime.fromisoformat(created_at), str(last_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+# Composable queries
+class FindQuery:
+    """Filters, sorting, projection and paging composed into a single find.
+    
+    Built with BaseCRUD.query() and executed with to_list(), e.g.
+    bookings_crud.query().where(status="pending", tour_id="1").sort("-created_at").limit(20)
+    """
+    
+    def __init__(self, crud: "BaseCRUD"):
+        self.crud = crud
+        self.filters: Dict[str, Any] = {}
+        self.sort_spec: List[tuple] = []
+        self.projection: Dict[str, int] = projection_for()
+        self.skip_count = 0
+        self.limit_count = 100
+    
+    def where(self, **conditions) -> "FindQuery":
+        """Add equality or operator conditions, None values are ignored"""
+        for field, value in conditions.items():
+            if value is not None:
+                self.filters[field] = value
+        return self
+    
+    def filter(self, filters: Optional[dict]) -> "FindQuery":
+        """Merge a raw Mongo filter document"""
+        if filters:
+            self.filters.update(filters)
+        return self
+    
+    def sort(self, spec: Optional[str], allowed: Optional[List[str]] = None) -> "FindQuery":
+        """Sort by comma separated fields, "-" prefix for descending.
+        
+        Raises ValueError for fields outside allowed.
+        """
+        if not spec:
+            return self
+        for part in spec.split(","):
+            part = part.strip()
+            field = part.lstrip("-")
+            if not field or (allowed is not None and field not in allowed):
+                raise ValueError(f"Cannot sort by '{field}'")
+            self.sort_spec.append((field, DESCENDING if part.startswith("-") else ASCENDING))
+        return self
+    
+    def project(self, fields: Optional[List[str]]) -> "FindQuery":
+        """Return only the given fields"""
+        self.projection = projection_for(fields)
+        return self
+    
+    def skip(self, count: int) -> "FindQuery":
+        self.skip_count = count
+        return self
+    
+    def limit(self, count: int) -> "FindQuery":
+        self.limit_count = count
+        return self
+    
+    def cache_params(self) -> dict:
+        return {
+            "filters": self.filters,
+            "sort": self.sort_spec,
+            "projection": self.projection,
+            "skip": self.skip_count,
+            "limit": self.limit_count,
+        }
+    
+    async def to_list(self) -> List[dict]:
+        return await self.crud.find(self)
+
+# Per-collection time of the latest delete, which updated_at cannot show
+VERSIONS_COLLECTION = "collection_versions"
+
 # Base CRUD operations
 class BaseCRUD:
+    # Indexes shared by every collection. The unique id index is sparse so it
+    # can be built before backfill_ids has given legacy documents an id.
+    base_indexes: List[IndexModel] = [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True, sparse=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+    ]
+    # Collection specific indexes, declared by subclasses. Those serving filtered
+    # get_page reads end in (created_at, id) so the page needs no in-memory sort.
+    indexes: List[IndexModel] = []
+    # Seconds to cache list reads for, None disables caching
+    cache_ttl: Optional[float] = None
+    # Read preference and read concern for this collection, None uses the client's
+    read_preference = None
+    read_concern: Optional[ReadConcern] = None
+    
     def __init__(self, collection_name: str):
         self.collection_name = collection_name
+        self.last_write = 0.0
         
     @property
     def collection(self):
-        return get_database()[self.collection_name]
+        read_preference = self.read_preference
+        # Right after a write, read from the primary so caches refill with the new data
+        if read_preference is not None and time.monotonic() - self.last_write < READ_YOUR_WRITES_SECONDS:
+            read_preference = ReadPreference.PRIMARY
+        return self.collection_for(read_preference)
+    
+    def collection_for(self, read_preference=None, read_concern: Optional[ReadConcern] = None):
+        """Collection with the given read options, falling back to the class defaults"""
+        collection = get_database()[self.collection_name]
+        read_concern = read_concern or self.read_concern
+        if read_preference is None and read_concern is None:
+            return collection
+        return collection.with_options(read_preference=read_preference, read_concern=read_concern)
     
-    async def create(self, data: dict) -> dict:
+    async def ensure_indexes(self) -> List[str]:
+        """Create declared indexes that are missing, return the names created.
+        
+        An index whose declared keys or TTL changed since it was built is rebuilt.
+        """
+        declared = self.base_indexes + self.indexes
+        existing = await self.collection.index_information()
+        for index in declared:
+            name = index.document["name"]
+            keys = list(index.document["key"].items())
+            if name in existing and (
+                list(existing[name]["key"]) != keys
+                or existing[name].get("expireAfterSeconds") != index.document.get("expireAfterSeconds")
+            ):
+                await self.collection.drop_index(name)
+                del existing[name]
+        existing_keys = [list(info["key"]) for info in existing.values()]
+        missing = [
+            index for index in declared
+            if index.document["name"] not in existing
+            and list(index.document["key"].items()) not in existing_keys
+        ]
+        if not missing:
+            return []
+        return await self.collection.create_indexes(missing)
+    
+    async def backfill_ids(self) -> int:
+        """Give documents stored without an application id one derived from _id.
+        
+        Legacy API responses exposed str(_id) as the id, so existing links keep working.
+        """
+        result = await self.collection.update_many(
+            {"id": {"$exists": False}},
+            [{"$set": {"id": {"$toString": "$_id"}}}]
+        )
+        return result.modified_count
+    
+    def cache_key(self, operation: str, **params) -> tuple:
+        return (self.collection_name, operation, repr(sorted(params.items())))
+    
+    def invalidate_cache(self):
+        """Drop cached reads of this collection, called after every write"""
+        self.last_write = time.monotonic()
+        catalog_cache.invalidate(self.collection_name)
+    
+    async def create(self, data: dict, session=None) -> dict:
         """Create a new document"""
+        data.setdefault('id', str(uuid.uuid4()))
         data['created_at'] = datetime.utcnow()
         data['updated_at'] = datetime.utcnow()
-        result = await self.collection.insert_one(data)
-        created_doc = await self.collection.find_one({"_id": result.inserted_id})
-        created_doc['id'] = str(created_doc['_id'])
-        del created_doc['_id']
-        return created_doc
-    
-    async def get_by_id(self, id: str) -> Optional[dict]:
-        """Get document by ID"""
-        doc = await self.collection.find_one({"id": id})
-        if doc:
-            doc['id'] = str(doc['_id']) if 'id' not in doc else doc['id']
-            if '_id' in doc:
-                del doc['_id']
-        return doc
+        # insert_one sets _id on data, which is then exactly the stored document
+        await self.collection.insert_one(data, session=session)
+        self.invalidate_cache()
+        del data['_id']
+        return data
     
-    async def get_all(self, skip: int = 0, limit: int = 100, filters: dict = None) -> List[dict]:
-        """Get all documents with optional filters"""
-        query = filters or {}
-        cursor = self.collection.find(query).skip(skip).limit(limit)
-        docs = await cursor.to_list(length=limit)
+    async def create_many(self, docs: List[dict]) -> Tuple[List[dict], Dict[int, str]]:
+        """Insert documents in one unordered batch.
+        
+        Returns the created documents and a map of failed batch index to error.
+        """
+        if not docs:
+            return [], {}
+        now = datetime.utcnow()
         for doc in docs:
-            doc['id'] = str(doc['_id']) if 'id' not in doc else doc['id']
-            if '_id' in doc:
-                del doc['_id']
+            doc.setdefault('id', str(uuid.uuid4()))
+            doc['created_at'] = now
+            doc['updated_at'] = now
+        
+        errors = {}
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+        self.invalidate_cache()
+        
+        created = []
+        for index, doc in enumerate(docs):
+            del doc['_id']
+            if index not in errors:
+                created.append(doc)
+        return created, errors
+    
+    async def insert_missing(self, docs: List[dict]) -> int:
+        """Insert documents whose id is not stored yet in one batch, return how many were added.
+        
+        Upserts with $setOnInsert leave existing documents untouched, so
+        repeated or concurrent runs with the same ids are harmless.
+        """
+        if not docs:
+            return 0
+        now = datetime.utcnow()
+        result = await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"id": doc["id"]},
+                    {"$setOnInsert": {**without_id(doc), "created_at": now, "updated_at": now}},
+                    upsert=True
+                )
+                for doc in docs
+            ],
+            ordered=False
+        )
+        self.invalidate_cache()
+        return result.upserted_count
+    
+    async def get_by_id(self, id: str, fields: Optional[List[str]] = None) -> Optional[dict]:
+        """Get document by ID, optionally projected to the given fields"""
+        return await self.collection.find_one({"id": id}, projection_for(fields))
+    
+    def query(self) -> FindQuery:
+        """Start a composable query on this collection"""
+        return FindQuery(self)
+    
+    async def find(self, query: FindQuery) -> List[dict]:
+        """Run a composed query as one Mongo find"""
+        if self.cache_ttl:
+            key = self.cache_key("find", **query.cache_params())
+            cached = catalog_cache.get(key)
+            if cached is not None:
+                return [dict(doc) for doc in cached]
+        
+        cursor = self.collection.find(query.filters, query.projection)
+        if query.sort_spec:
+            cursor = cursor.sort(query.sort_spec)
+        cursor = cursor.skip(query.skip_count).limit(query.limit_count)
+        docs = await cursor.to_list(length=query.limit_count)
+        
+        if self.cache_ttl:
+            catalog_cache.set(key, docs, tags=(self.collection_name,), ttl=self.cache_ttl)
+            return [dict(doc) for doc in docs]
         return docs
     
+    async def get_all(self, skip: int = 0, limit: int = 100, filters: dict = None) -> List[dict]:
+        """Get all documents with optional filters"""
+        return await self.query().filter(filters).skip(skip).limit(limit).to_list()
+    
+    async def get_page(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        filters: dict = None,
+        include_total: bool = False
+    ) -> dict:
+        """Get one page of documents, newest first, using keyset pagination.
+        
+        Pages are ordered by (created_at, id) so every page is a single
+        index range scan no matter how deep it is. Raises ValueError for a
+        malformed cursor.
+        """
+        query = dict(filters or {})
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "id": {"$lt": last_id}},
+            ]
+        
+        find = self.collection.find(query, projection_for()).sort([("created_at", DESCENDING), ("id", DESCENDING)])
+        docs = await find.limit(limit + 1).to_list(length=limit + 1)
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["created_at"], docs[-1]["id"])
+        
+        return {
+            "items": docs,
+            "next_cursor": next_cursor,
+            "per_page": limit,
+            "total": await self.count(filters) if include_total else None,
+        }
+    
     async def update(self, id: str, data: dict) -> Optional[dict]:
         """Update document by ID"""
         data['updated_at'] = datetime.utcnow()
         # Remove None values
         data = {k: v for k, v in data.items() if v is not None}
         
-        result = await self.collection.update_one(
+        doc = await self.collection.find_one_and_update(
             {"id": id},
-            {"$set": data}
+            {"$set": data},
+            projection=projection_for(),
+            return_document=ReturnDocument.AFTER
         )
-        
-        if result.matched_count:
-            return await self.get_by_id(id)
-        return None
+        self.invalidate_cache()
+        return doc
     
     async def delete(self, id: str) -> bool:
         """Delete document by ID"""
         result = await self.collection.delete_one({"id": id})
+        if result.deleted_count:
+            await self.record_delete()
+        self.invalidate_cache()
         return result.deleted_count > 0
     
+    async def record_delete(self):
+        """Move the collection version forward, a delete leaves no updated_at behind"""
+        await get_database()[VERSIONS_COLLECTION].update_one(
+            {"_id": self.collection_name},
+            {"$max": {"deleted_at": datetime.utcnow()}},
+            upsert=True
+        )
+    
+    async def get_many_by_ids(self, ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, dict]:
+        """Get documents for several IDs in one query, keyed by ID"""
+        cursor = self.collection.find({"id": {"$in": list(set(ids))}}, projection_for(fields))
+        docs = await cursor.to_list(length=None)
+        return {doc["id"]: doc for doc in docs}
+    
+    async def iter_documents(self, filters: dict = None, batch_size: int = 500,
+                             read_preference=None) -> AsyncIterator[dict]:
+        """Stream documents from a server side cursor, oldest first"""
+        collection = self.collection_for(read_preference) if read_preference else self.collection
+        cursor = collection.find(filters or {}, projection_for()).sort("created_at", ASCENDING)
+        async for doc in cursor.batch_size(batch_size):
+            yield doc
+    
+    async def get_version(self) -> dict:
+        """Cheap change marker for the collection: latest updated_at or delete, and document count"""
+        key = self.cache_key("version")
+        if self.cache_ttl:
+            cached = catalog_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        latest = await self.collection.find_one({}, projection_for(["updated_at"]), sort=[("updated_at", DESCENDING)])
+        deletes = await get_database()[VERSIONS_COLLECTION].find_one({"_id": self.collection_name})
+        changes = [doc[field] for doc, field in ((latest, "updated_at"), (deletes, "deleted_at")) if doc and doc.get(field)]
+        version = {
+            "updated_at": max(changes) if changes else None,
+            "count": await self.collection.estimated_document_count(),
+        }
+        if self.cache_ttl:
+            catalog_cache.set(key, version, tags=(self.collection_name,), ttl=self.cache_ttl)
+        return version
+    
     async def count(self, filters: dict = None) -> int:
         """Count documents with optional filters"""
         query = filters or {}
         return await self.collection.count_documents(query)
 
 # Specific CRUD classes
+# Public catalog collections change rarely and are read on every page view
+CATALOG_CACHE_TTL = float(os.environ.get("CATALOG_CACHE_TTL_SECONDS", 300))
+# Catalog content tolerates seconds of replica lag, so its reads go to
+# secondaries when there are any and leave the primary to bookings
+CATALOG_READ_PREFERENCE = read_preference_from_env("MONGO_CATALOG_READ_PREFERENCE", "secondaryPreferred")
+CATALOG_READ_CONCERN = ReadConcern(os.environ.get("MONGO_CATALOG_READ_CONCERN", "local"))
+# Exports scan whole collections and may lag the primary as well
+EXPORT_READ_PREFERENCE = read_preference_from_env("MONGO_EXPORT_READ_PREFERENCE", "secondaryPreferred")
+
 class TourCRUD(BaseCRUD):
+    cache_ttl = CATALOG_CACHE_TTL
+    read_preference = CATALOG_READ_PREFERENCE
+    read_concern = CATALOG_READ_CONCERN
+    indexes = [
+        IndexModel([("level", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="level"),
+    ]
+    
     def __init__(self):
         super().__init__("tours")
     
-    async def get_by_level(self, level: str) -> List[dict]:
+    async def get_by_level(self, level: str, skip: int = 0, limit: int = 100) -> List[dict]:
         """Get tours by level"""
-        return await self.get_all(filters={"level": level})
+        return await self.get_all(skip=skip, limit=limit, filters={"level": level})
 
 class CoachCRUD(BaseCRUD):
+    cache_ttl = CATALOG_CACHE_TTL
+    read_preference = CATALOG_READ_PREFERENCE
+    read_concern = CATALOG_READ_CONCERN
+    
     def __init__(self):
         super().__init__("coaches")
 
 class TestimonialCRUD(BaseCRUD):
+    cache_ttl = CATALOG_CACHE_TTL
+    read_preference = CATALOG_READ_PREFERENCE
+    read_concern = CATALOG_READ_CONCERN
+    indexes = [
+        IndexModel([("approved", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="approved_created_at"),
+    ]
+    
     def __init__(self):
         super().__init__("testimonials")
     
-    async def get_approved(self) -> List[dict]:
+    async def get_approved(self, skip: int = 0, limit: int = 100) -> List[dict]:
         """Get approved testimonials only"""
-        return await self.get_all(filters={"approved": True})
+        return await self.get_all(skip=skip, limit=limit, filters={"approved": True})
 
 class GalleryCRUD(BaseCRUD):
+    cache_ttl = CATALOG_CACHE_TTL
+    read_preference = CATALOG_READ_PREFERENCE
+    read_concern = CATALOG_READ_CONCERN
+    indexes = [
+        IndexModel([("category", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="category"),
+    ]
+    
     def __init__(self):
         super().__init__("gallery")
     
-    async def get_by_category(self, category: str) -> List[dict]:
+    async def get_by_category(self, category: str, skip: int = 0, limit: int = 100) -> List[dict]:
         """Get gallery items by category"""
-        return await self.get_all(filters={"category": category})
+        return await self.get_all(skip=skip, limit=limit, filters={"category": category})
+
+# Attempts at a seat-changing booking update before giving up on concurrent edits
+SEAT_UPDATE_ATTEMPTS = 3
+
+class SeatsUnavailableError(Exception):
+    """The tour has fewer seats left than the booking needs"""
+    message = "Not enough seats left on this tour"
+    
+    def __init__(self, tour_id: str):
+        super().__init__(f"{self.message}: {tour_id}")
+        self.tour_id = tour_id
 
 class BookingCRUD(BaseCRUD):
+    # Bookings are read back to check availability and prices, never from a lagging secondary
+    read_preference = ReadPreference.PRIMARY
+    indexes = [
+        IndexModel([("tour_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="tour_id_status"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_at"),
+    ]
+    
     def __init__(self):
         super().__init__("bookings")
     
-    async def get_by_status(self, status: str) -> List[dict]:
+    async def get_by_status(self, status: str, skip: int = 0, limit: int = 100) -> List[dict]:
         """Get bookings by status"""
-        return await self.get_all(filters={"status": status})
+        return await self.get_all(skip=skip, limit=limit, filters={"status": status})
     
-    async def get_by_tour(self, tour_id: str) -> List[dict]:
+    async def get_by_tour(self, tour_id: str, skip: int = 0, limit: int = 100) -> List[dict]:
         """Get bookings for specific tour"""
-        return await self.get_all(filters={"tour_id": tour_id})
+        return await self.get_all(skip=skip, limit=limit, filters={"tour_id": tour_id})
     
-    async def get_stats(self) -> dict:
-        """Get booking statistics"""
+    # Materialized statistics, kept up to date with $inc on every write
+    stats_collection_name = "booking_stats"
+    stats_id = "bookings"
+    
+    @property
+    def stats_collection(self):
+        return get_database()[self.stats_collection_name]
+    
+    @staticmethod
+    def stats_contribution(booking: Optional[dict]) -> Dict[str, float]:
+        """Counters a single booking adds to the stats document.
+        
+        Revenue excludes cancelled bookings, by_status revenue is the raw total.
+        """
+        if not booking:
+            return {}
+        status = getattr(booking.get("status"), "value", booking.get("status")) or "pending"
+        price = booking.get("total_price") or 0.0
+        revenue = 0.0 if status == "cancelled" else price
+        created_at = booking.get("created_at") or datetime.utcnow()
+        month = created_at.strftime("%Y-%m")
+        tour_id = booking.get("tour_id")
+        return {
+            "total": 1,
+            "revenue": revenue,
+            f"by_status.{status}.count": 1,
+            f"by_status.{status}.revenue": price,
+            f"by_tour.{tour_id}.count": 1,
+            f"by_tour.{tour_id}.revenue": revenue,
+            f"by_month.{month}.count": 1,
+            f"by_month.{month}.revenue": revenue,
+        }
+    
+    async def apply_stats_change(self, before: Optional[dict], after: Optional[dict]):
+        """Move counters from the old version of a booking to the new one"""
+        delta = dict(self.stats_contribution(after))
+        for field, value in self.stats_contribution(before).items():
+            delta[field] = delta.get(field, 0) - value
+        await self.apply_stats_delta(delta)
+    
+    async def apply_stats_delta(self, delta: Dict[str, float]):
+        delta = {field: value for field, value in delta.items() if value}
+        if not delta:
+            return
+        await self.stats_collection.update_one(
+            {"_id": self.stats_id},
+            {"$inc": delta, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+    
+    # Seats taken per tour, reserved with a conditional $inc so tours are never oversold
+    seats_collection_name = "tour_seats"
+    seat_fields = ("tour_id", "participants", "status")
+    
+    @property
+    def seats_collection(self):
+        return get_database()[self.seats_collection_name]
+    
+    @staticmethod
+    def seats_held(booking: Optional[dict]) -> Dict[str, int]:
+        """Seats a booking holds per tour, cancelled bookings hold none"""
+        if not booking:
+            return {}
+        status = getattr(booking.get("status"), "value", booking.get("status")) or "pending"
+        if status == "cancelled":
+            return {}
+        return {booking["tour_id"]: booking.get("participants") or 0}
+    
+    def seat_changes(self, before: Optional[dict], after: Optional[dict]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Seats to reserve and seats to release when a booking changes from before to after"""
+        delta = dict(self.seats_held(after))
+        for tour_id, seats in self.seats_held(before).items():
+            delta[tour_id] = delta.get(tour_id, 0) - seats
+        reserve = {tour_id: seats for tour_id, seats in delta.items() if seats > 0}
+        release = {tour_id: -seats for tour_id, seats in delta.items() if seats < 0}
+        return reserve, release
+    
+    async def _reserve(self, tour_id: str, seats: int) -> bool:
+        for _ in range(2):
+            result = await self.seats_collection.update_one(
+                {
+                    "_id": tour_id,
+                    "$or": [
+                        {"capacity": None},
+                        {"$expr": {"$lte": [{"$add": [{"$ifNull": ["$seats_taken", 0]}, seats]}, "$capacity"]}},
+                    ],
+                },
+                {"$inc": {"seats_taken": seats}}
+            )
+            if result.matched_count:
+                return True
+            if await self.seats_collection.count_documents({"_id": tour_id}, limit=1):
+                return False
+            # First booking of the tour, start its counter and try again
+            await self.reconcile_seats([tour_id], only_missing=True)
+        return False
+    
+    async def reserve_seats(self, seats: Dict[str, int]) -> bool:
+        """Take seats on every tour or on none, False when a tour has too few left"""
+        reserved = {}
+        for tour_id, count in seats.items():
+            if not await self._reserve(tour_id, count):
+                await self.release_seats(reserved)
+                return False
+            reserved[tour_id] = count
+        return True
+    
+    async def release_seats(self, seats: Dict[str, int]):
+        for tour_id, count in seats.items():
+            if count:
+                await self.seats_collection.update_one({"_id": tour_id}, {"$inc": {"seats_taken": -count}})
+    
+    async def set_capacity(self, tour_id: str, capacity: Optional[int]):
+        """Mirror a tour's capacity onto its seat counter"""
+        await self.seats_collection.update_one({"_id": tour_id}, {"$set": {"capacity": capacity}})
+    
+    async def get_availability(self, tour_id: str) -> Optional[dict]:
+        """Seats left on a tour from its counter, None when the tour does not exist"""
+        seats = await self.seats_collection.find_one({"_id": tour_id})
+        if not seats:
+            if not await self.reconcile_seats([tour_id], only_missing=True):
+                return None
+            seats = await self.seats_collection.find_one({"_id": tour_id})
+        capacity = seats.get("capacity")
+        seats_taken = seats.get("seats_taken", 0)
+        seats_left = None if capacity is None else max(capacity - seats_taken, 0)
+        return {
+            "tour_id": tour_id,
+            "capacity": capacity,
+            "seats_taken": seats_taken,
+            "seats_left": seats_left,
+            "available": seats_left is None or seats_left > 0,
+        }
+    
+    async def reconcile_seats(self, tour_ids: Optional[List[str]] = None, only_missing: bool = False) -> int:
+        """Rebuild seat counters from tour capacities and active bookings, return tours written.
+        
+        only_missing starts counters for tours that have none and leaves existing ones alone,
+        which is safe alongside reservations. A full rebuild can lose reservations racing with it.
+        """
+        tour_filter = {"id": {"$in": tour_ids}} if tour_ids is not None else {}
+        tours = await tours_crud.collection_for(ReadPreference.PRIMARY).find(
+            tour_filter, projection_for(["id", "capacity"])
+        ).to_list(length=None)
+        if only_missing and tours:
+            existing = set(await self.seats_collection.distinct("_id", {"_id": {"$in": [tour["id"] for tour in tours]}}))
+            tours = [tour for tour in tours if tour["id"] not in existing]
+        if not tours:
+            return 0
+        
+        pipeline = [
+            {"$match": {"tour_id": {"$in": [tour["id"] for tour in tours]}, "status": {"$ne": "cancelled"}}},
+            {"$group": {"_id": "$tour_id", "seats": {"$sum": "$participants"}}},
+        ]
+        held = {row["_id"]: row["seats"] async for row in self.collection.aggregate(pipeline)}
+        operator = "$setOnInsert" if only_missing else "$set"
+        await self.seats_collection.bulk_write([
+            UpdateOne(
+                {"_id": tour["id"]},
+                {operator: {"capacity": tour.get("capacity"), "seats_taken": held.get(tour["id"], 0)}},
+                upsert=True
+            )
+            for tour in tours
+        ], ordered=False)
+        return len(tours)
+    
+    async def create(self, data: dict, session=None) -> dict:
+        data.setdefault("status", "pending")
+        seats = self.seats_held(data)
+        if not await self.reserve_seats(seats):
+            raise SeatsUnavailableError(data["tour_id"])
+        try:
+            created = await super().create(data, session=session)
+        except Exception:
+            await self.release_seats(seats)
+            raise
+        await self.apply_stats_change(None, created)
+        return created
+    
+    async def create_with_outbox(self, data: dict, events_for: Callable[[dict], List[dict]]) -> dict:
+        """Create a booking together with the outbox events describing it.
+        
+        Both writes share a transaction where the deployment supports one;
+        on a standalone server the events are written right after the booking.
+        Seats are reserved first and given back if the booking is not written,
+        or is deleted again because its events could not be.
+        """
+        data.setdefault("id", str(uuid.uuid4()))
+        data.setdefault("status", "pending")
+        seats = self.seats_held(data)
+        if not await self.reserve_seats(seats):
+            raise SeatsUnavailableError(data["tour_id"])
+        events = events_for(data)
+        if supports_transactions():
+            try:
+                async with await Database.client.start_session() as session:
+                    async with session.start_transaction():
+                        created = await super().create(data, session=session)
+                        await outbox_crud.enqueue(events, session=session)
+            except Exception:
+                await self.release_seats(seats)
+                raise
+            await self.apply_stats_change(None, created)
+            return created
+        
+        try:
+            created = await super().create(data)
+        except Exception:
+            await self.release_seats(seats)
+            raise
+        await self.apply_stats_change(None, created)
+        try:
+            await outbox_crud.enqueue(events)
+        except Exception:
+            # The request fails, so take the booking back along with its seats and stats
+            await self.delete(created["id"])
+            raise
+        return created
+    
+    def seats_total(self, docs: List[dict]) -> Dict[str, int]:
+        """Seats a set of bookings holds per tour"""
+        total = {}
+        for doc in docs:
+            for tour_id, seats in self.seats_held(doc).items():
+                total[tour_id] = total.get(tour_id, 0) + seats
+        return total
+    
+    async def create_many(self, docs: List[dict]) -> Tuple[List[dict], Dict[int, str]]:
+        """Insert the bookings that fit their tours, reporting the rest as errors.
+        
+        Seats are reserved with one $inc per tour, row by row only for a tour
+        too full to take all of its rows.
+        """
+        rows_by_tour: Dict[str, List[int]] = {}
+        for index, doc in enumerate(docs):
+            doc.setdefault("id", str(uuid.uuid4()))
+            doc.setdefault("status", "pending")
+            for tour_id in self.seats_held(doc):
+                rows_by_tour.setdefault(tour_id, []).append(index)
+        
+        errors = {}
+        for tour_id, rows in rows_by_tour.items():
+            if await self._reserve(tour_id, sum(docs[index]["participants"] for index in rows)):
+                continue
+            for index in rows:
+                if not await self._reserve(tour_id, docs[index]["participants"]):
+                    errors[index] = SeatsUnavailableError.message
+        
+        seated = [index for index in range(len(docs)) if index not in errors]
+        try:
+            created, write_errors = await super().create_many([docs[index] for index in seated])
+        except Exception:
+            # Give back the seats of rows that did not make it before the failure
+            ids = [docs[index]["id"] for index in seated]
+            stored = set(await self.collection.distinct("id", {"id": {"$in": ids}}))
+            await self.release_seats(self.seats_total([docs[index] for index in seated if docs[index]["id"] not in stored]))
+            raise
+        await self.release_seats(self.seats_total([docs[seated[batch_index]] for batch_index in write_errors]))
+        errors.update({seated[batch_index]: error for batch_index, error in write_errors.items()})
+        delta = {}
+        for doc in created:
+            for field, value in self.stats_contribution(doc).items():
+                delta[field] = delta.get(field, 0) + value
+        await self.apply_stats_delta(delta)
+        return created, errors
+    
+    async def create_many_with_outbox(self, docs: List[dict], events_for: Callable[[dict], List[dict]]) -> Tuple[List[dict], Dict[int, str]]:
+        """Insert bookings like create_many, then the outbox events of the created ones.
+        
+        Rows fail one by one, so the events are written after the batch rather
+        than in a transaction; if they cannot be, the bookings are taken back.
+        """
+        created, errors = await self.create_many(docs)
+        try:
+            await outbox_crud.enqueue([event for doc in created for event in events_for(doc)])
+        except Exception:
+            for doc in created:
+                await self.delete(doc["id"])
+            raise
+        return created, errors
+    
+    async def update(self, id: str, data: dict) -> Optional[dict]:
+        """Update booking, moving its seats and stats contribution"""
+        data['updated_at'] = datetime.utcnow()
+        data = {k: v for k, v in data.items() if v is not None}
+        
+        if not any(field in data for field in self.seat_fields):
+            before = await self.collection.find_one_and_update(
+                {"id": id},
+                {"$set": data},
+                projection=projection_for(),
+                return_document=ReturnDocument.BEFORE
+            )
+            self.invalidate_cache()
+            if not before:
+                return None
+            after = {**before, **data}
+            await self.apply_stats_change(before, after)
+            return after
+        
+        # Reserve first, then write only if the seat fields are still as read, else undo and retry
+        for _ in range(SEAT_UPDATE_ATTEMPTS):
+            before = await self.collection.find_one({"id": id}, projection_for())
+            if not before:
+                return None
+            after = {**before, **data}
+            reserve, release = self.seat_changes(before, after)
+            if not await self.reserve_seats(reserve):
+                raise SeatsUnavailableError(after["tour_id"])
+            unchanged = {field: before.get(field) for field in self.seat_fields}
+            result = await self.collection.update_one({"id": id, **unchanged}, {"$set": data})
+            if result.matched_count:
+                self.invalidate_cache()
+                await self.release_seats(release)
+                await self.apply_stats_change(before, after)
+                return after
+            await self.release_seats(reserve)
+        raise RuntimeError(f"Booking {id} kept changing during update")
+    
+    async def delete(self, id: str) -> bool:
+        """Delete booking, giving back its seats and stats contribution"""
+        deleted = await self.collection.find_one_and_delete({"id": id})
+        if deleted:
+            await self.record_delete()
+        self.invalidate_cache()
+        if not deleted:
+            return False
+        await self.release_seats(self.seats_held(deleted))
+        await self.apply_stats_change(deleted, None)
+        return True
+    
+    async def reconcile_stats(self) -> dict:
+        """Rebuild the stats document from a full aggregation.
+        
+        Increments racing with the rebuild can be lost, the next run fixes them.
+        """
+        status = {"$ifNull": ["$status", "pending"]}
+        price = {"$ifNull": ["$total_price", 0]}
+        revenue = {"$cond": [{"$eq": [status, "cancelled"]}, 0, price]}
         pipeline = [
             {
-                "$group": {
-                    "_id": "$status",
-                    "count": {"$sum": 1}
+                "$facet": {
+                    "by_status": [
+                        {"$group": {"_id": status, "count": {"$sum": 1}, "revenue": {"$sum": price}}}
+                    ],
+                    "by_tour": [
+                        {"$group": {"_id": "$tour_id", "count": {"$sum": 1}, "revenue": {"$sum": revenue}}}
+                    ],
+                    "by_month": [
+                        {"$group": {
+                            "_id": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+                            "count": {"$sum": 1},
+                            "revenue": {"$sum": revenue}
+                        }}
+                    ],
                 }
             }
         ]
-        
         cursor = self.collection.aggregate(pipeline)
-        results = await cursor.to_list(length=None)
+        results = (await cursor.to_list(length=1))[0]
+        
+        def buckets(rows):
+            return {str(row["_id"]): {"count": row["count"], "revenue": row["revenue"]} for row in rows}
         
+        now = datetime.utcnow()
         stats = {
-            "total_bookings": 0,
-            "pending_bookings": 0,
-            "confirmed_bookings": 0,
-            "cancelled_bookings": 0
+            "total": sum(row["count"] for row in results["by_status"]),
+            "revenue": sum(row["revenue"] for row in results["by_tour"]),
+            "by_status": buckets(results["by_status"]),
+            "by_tour": buckets(results["by_tour"]),
+            "by_month": buckets(results["by_month"]),
+            "updated_at": now,
+            "reconciled_at": now,
         }
-        
-        for result in results:
-            status = result["_id"]
-            count = result["count"]
-            stats["total_bookings"] += count
-            if status == "pending":
-                stats["pending_bookings"] = count
-            elif status == "confirmed":
-                stats["confirmed_bookings"] = count
-            elif status == "cancelled":
-                stats["cancelled_bookings"] = count
-        
+        await self.stats_collection.replace_one({"_id": self.stats_id}, stats, upsert=True)
         return stats
+    
+    async def get_stats(self) -> dict:
+        """Get booking statistics from the materialized stats document"""
+        stats = await self.stats_collection.find_one({"_id": self.stats_id})
+        if not stats:
+            stats = await self.reconcile_stats()
+        
+        by_status = stats.get("by_status", {})
+        return {
+            "total_bookings": stats.get("total", 0),
+            "pending_bookings": by_status.get("pending", {}).get("count", 0),
+            "confirmed_bookings": by_status.get("confirmed", {}).get("count", 0),
+            "cancelled_bookings": by_status.get("cancelled", {}).get("count", 0),
+            "total_revenue": stats.get("revenue", 0.0),
+            "by_status": by_status,
+            "by_tour": stats.get("by_tour", {}),
+            "by_month": stats.get("by_month", {}),
+            "reconciled_at": stats.get("reconciled_at"),
+        }
 
 class ContactCRUD(BaseCRUD):
+    indexes = [
+        IndexModel([("read", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="read_created_at"),
+    ]
+    
     def __init__(self):
         super().__init__("contacts")
     
-    async def get_unread(self) -> List[dict]:
+    async def get_unread(self, skip: int = 0, limit: int = 100) -> List[dict]:
         """Get unread contact messages"""
-        return await self.get_all(filters={"read": False})
+        return await self.get_all(skip=skip, limit=limit, filters={"read": False})
     
     async def mark_as_read(self, id: str) -> bool:
         """Mark message as read"""
@@ -177,19 +988,28 @@ class ContactCRUD(BaseCRUD):
             {"id": id},
             {"$set": {"read": True, "updated_at": datetime.utcnow()}}
         )
+        self.invalidate_cache()
         return result.matched_count > 0
 
 class SettingsCRUD(BaseCRUD):
+    cache_ttl = CATALOG_CACHE_TTL
+    read_preference = CATALOG_READ_PREFERENCE
+    read_concern = CATALOG_READ_CONCERN
+    
     def __init__(self):
         super().__init__("settings")
     
     async def get_settings(self) -> Optional[dict]:
         """Get company settings (should be only one document)"""
-        settings = await self.collection.find_one()
+        key = self.cache_key("get_settings")
+        cached = catalog_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
+        settings = await self.collection.find_one({}, projection_for())
         if settings:
-            settings['id'] = str(settings['_id']) if 'id' not in settings else settings['id']
-            if '_id' in settings:
-                del settings['_id']
+            catalog_cache.set(key, settings, tags=(self.collection_name,), ttl=self.cache_ttl)
+            return dict(settings)
         return settings
     
     async def update_settings(self, data: dict) -> dict:
@@ -199,19 +1019,98 @@ class SettingsCRUD(BaseCRUD):
         # Remove None values
         data = {k: v for k, v in data.items() if v is not None}
         
-        existing = await self.get_settings()
-        if existing:
-            await self.collection.update_one(
-                {"id": existing["id"]},
-                {"$set": data}
-            )
-            return await self.get_settings()
+        # There is a single settings document, update it in place if present
+        settings = await self.collection.find_one_and_update(
+            {},
+            {"$set": data},
+            projection=projection_for(),
+            return_document=ReturnDocument.AFTER
+        )
+        if settings:
+            self.invalidate_cache()
+            return settings
         else:
             # Create new settings
             data['id'] = str(uuid.uuid4())
             data['created_at'] = datetime.utcnow()
             return await self.create(data)
 
+# Delivered and abandoned outbox events are removed this long after they finished
+OUTBOX_RETENTION_SECONDS = int(os.environ.get("OUTBOX_RETENTION_SECONDS", 7 * 86400))
+
+class OutboxCRUD(BaseCRUD):
+    """Events waiting to be delivered by the background outbox worker"""
+    indexes = [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel(
+            [("updated_at", ASCENDING)], name="finished_ttl",
+            expireAfterSeconds=OUTBOX_RETENTION_SECONDS,
+            partialFilterExpression={"status": {"$in": ["done", "failed"]}}
+        ),
+    ]
+    
+    def __init__(self):
+        super().__init__("outbox")
+    
+    async def enqueue(self, events: List[dict], session=None):
+        """Store events as pending, each event needs a type and a payload"""
+        if not events:
+            return
+        now = datetime.utcnow()
+        docs = [
+            {
+                "id": str(uuid.uuid4()),
+                "type": event["type"],
+                "payload": event["payload"],
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "last_error": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for event in events
+        ]
+        await self.collection.insert_many(docs, session=session)
+    
+    async def claim(self, lease_seconds: float) -> Optional[dict]:
+        """Lock the next due event, including ones whose previous lease expired"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            # A processing event whose lease ran out belongs to a worker that died
+            {"status": {"$in": ["pending", "processing"]}, "next_attempt_at": {"$lte": now}},
+            {
+                "$set": {
+                    "status": "processing",
+                    "next_attempt_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            projection=projection_for(),
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def complete(self, id: str):
+        await self.collection.update_one(
+            {"id": id},
+            {"$set": {"status": "done", "last_error": None, "updated_at": datetime.utcnow()}}
+        )
+    
+    async def reschedule(self, id: str, error: str, next_attempt_at: Optional[datetime]):
+        """Retry at next_attempt_at, or give up when it is None"""
+        changes = {"last_error": error, "updated_at": datetime.utcnow()}
+        if next_attempt_at:
+            changes.update({"status": "pending", "next_attempt_at": next_attempt_at})
+        else:
+            changes["status"] = "failed"
+        await self.collection.update_one({"id": id}, {"$set": changes})
+    
+    async def status_counts(self) -> Dict[str, int]:
+        cursor = self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        return {row["_id"]: row["count"] for row in await cursor.to_list(length=None)}
+
 # Initialize CRUD instances
 tours_crud = TourCRUD()
 coaches_crud = CoachCRUD()
@@ -219,4 +1118,54 @@ testimonials_crud = TestimonialCRUD()
 gallery_crud = GalleryCRUD()
 bookings_crud = BookingCRUD()
 contacts_crud = ContactCRUD()
-settings_crud = SettingsCRUD()
\ No newline at end of file
+settings_crud = SettingsCRUD()
+outbox_crud = OutboxCRUD()
+
+all_cruds = [
+    tours_crud,
+    coaches_crud,
+    testimonials_crud,
+    gallery_crud,
+    bookings_crud,
+    contacts_crud,
+    settings_crud,
+    outbox_crud,
+]
+
+async def backfill_ids() -> Dict[str, int]:
+    """Give legacy documents of every collection an id, return how many per collection"""
+    report = {}
+    for crud in all_cruds:
+        report[crud.collection_name] = await crud.backfill_ids()
+        if report[crud.collection_name]:
+            logger.info(f"Stored ids for {report[crud.collection_name]} legacy documents in {crud.collection_name}")
+    return report
+
+async def run_migration(name: str, migrate: Callable[[], Any], force: bool = False) -> bool:
+    """Run an idempotent migration unless recorded as done, then record it, return whether it ran"""
+    migrations = get_database()[MIGRATIONS_COLLECTION]
+    if not force and await migrations.find_one({"_id": name}):
+        return False
+    result = await migrate()
+    await migrations.update_one(
+        {"_id": name},
+        {"$set": {"completed_at": datetime.utcnow(), "result": result}},
+        upsert=True
+    )
+    return True
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Reconcile declared indexes for every collection, return what was created"""
+    report = {}
+    for crud in all_cruds:
+        report[crud.collection_name] = await crud.ensure_indexes()
+    return report
+
+async def run_stats_reconciliation(interval: float):
+    """Periodically rebuild materialized booking stats from the source collection"""
+    while True:
+        try:
+            await bookings_crud.reconcile_stats()
+        except Exception as e:
+            logger.error(f"Booking stats reconciliation failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,242 @@
+"""
+Request and database metrics in the Prometheus text format
+
+MetricsMiddleware times every request per route template and tracks requests
+in flight; MongoCommandMetrics times every command the driver sends per
+collection and command name. Cache and connection pool figures are read at
+scrape time. Everything is exposed on /api/metrics.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import threading
+import time
+
+from pymongo import monitoring
+from starlette.routing import Match
+
+from cache import catalog_cache
+from pool_monitor import pool_monitor
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Base for labelled metrics, safe to update from executor threads"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in values
+        ]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = HTTP_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (non cumulative), sum, count
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        lines = self.header()
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served", ("method",))
+mongo_command_duration = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command",
+    ("collection", "command"), buckets=MONGO_BUCKETS
+)
+mongo_command_failures = Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error",
+    ("collection", "command")
+)
+
+REGISTRY: List[Metric] = [http_request_duration, http_requests_in_flight, mongo_command_duration, mongo_command_failures]
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times driver commands per collection and command name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple, Tuple[str, str]] = {}
+
+    def started(self, event):
+        # getMore names the cursor id, the collection it reads comes separately
+        value = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        collection = value if isinstance(value, str) else "-"
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def _finished(self, event) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            labels = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            mongo_command_duration.observe(event.duration_micros / 1e6, collection=labels[0], command=labels[1])
+        return labels
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        labels = self._finished(event)
+        if labels:
+            mongo_command_failures.inc(collection=labels[0], command=labels[1])
+
+command_metrics = MongoCommandMetrics()
+
+def _route_templates(app) -> Dict[object, str]:
+    return {route.endpoint: route.path for route in getattr(app, "routes", []) if hasattr(route, "endpoint")}
+
+def _matching_template(scope) -> str:
+    for route in getattr(scope.get("app"), "routes", []):
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+        self._templates: Optional[Dict[object, str]] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method=method)
+            http_request_duration.observe(
+                time.perf_counter() - started, method=method, route=self.route_of(scope), status=status
+            )
+
+    def route_of(self, scope) -> str:
+        """Route template of the matched endpoint, keeps label cardinality bounded"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            # Answered before routing, e.g. a 304 from ConditionalRequestMiddleware
+            return _matching_template(scope)
+        if self._templates is None or endpoint not in self._templates:
+            self._templates = _route_templates(scope.get("app"))
+        return self._templates.get(endpoint, "unmatched")
+
+def _scrape_time_metrics() -> List[str]:
+    """Cache and pool figures kept elsewhere, read when scraped"""
+    cache = catalog_cache.stats()
+    lines = [
+        "# HELP cache_hits_total Catalog cache hits",
+        "# TYPE cache_hits_total counter",
+        f"cache_hits_total {cache['hits']}",
+        "# HELP cache_misses_total Catalog cache misses",
+        "# TYPE cache_misses_total counter",
+        f"cache_misses_total {cache['misses']}",
+        "# HELP cache_hit_ratio Catalog cache hits over lookups",
+        "# TYPE cache_hit_ratio gauge",
+        f"cache_hit_ratio {cache['hit_rate']}",
+    ]
+    pools = pool_monitor.stats()
+    for name, field, help in (
+        ("mongodb_pool_connections", "open_connections", "Open connections per server"),
+        ("mongodb_pool_in_use", "in_use", "Checked out connections per server"),
+    ):
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{address="{_escape(address)}"}} {pool[field]}' for address, pool in pools.items()]
+    return lines
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    lines += _scrape_time_metrics()
+    return "\n".join(lines) + "\n"
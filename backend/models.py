@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, create_model
+from typing import List, Optional, Dict, Any, Type
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -36,11 +36,14 @@ class TourBase(BaseModel):
     level: TourLevel
     accommodation: str
     price: str
+    base_price: Optional[float] = None
     currency: str = "Euro"
     description: str
     image: str
     features: List[str]
     group_size: str
+    # Seats sold per tour, None for no limit
+    capacity: Optional[int] = Field(None, ge=1)
 
 class TourCreate(TourBase):
     pass
@@ -52,11 +55,13 @@ class TourUpdate(BaseModel):
     level: Optional[TourLevel] = None
     accommodation: Optional[str] = None
     price: Optional[str] = None
+    base_price: Optional[float] = None
     currency: Optional[str] = None
     description: Optional[str] = None
     image: Optional[str] = None
     features: Optional[List[str]] = None
     group_size: Optional[str] = None
+    capacity: Optional[int] = Field(None, ge=1)
 
 class Tour(TourBase, BaseDBModel):
     pass
@@ -155,6 +160,16 @@ class BookingStatusUpdate(BaseModel):
 
 class Booking(BookingBase, BaseDBModel):
     status: BookingStatus = BookingStatus.PENDING
+    currency: Optional[str] = None
+
+class BulkBookingError(BaseModel):
+    index: int
+    error: str
+
+class BulkBookingResult(BaseModel):
+    created: int
+    ids: List[str]
+    errors: List[BulkBookingError] = []
 
 # Contact Models
 class ContactBase(BaseModel):
@@ -197,6 +212,29 @@ class CompanySettingsUpdate(BaseModel):
 class CompanySettings(CompanySettingsBase, BaseDBModel):
     pass
 
+# Partial Models for projected responses (?fields=title,price)
+def partial_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """Copy of model with every field optional"""
+    fields = {name: (Optional[field.annotation], None) for name, field in model.model_fields.items()}
+    return create_model(f"{model.__name__}Fields", **fields)
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """Parse a comma separated field list, raise ValueError for unknown fields"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in model.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id"] + requested))
+
+TourFields = partial_model(Tour)
+CoachFields = partial_model(Coach)
+TestimonialFields = partial_model(Testimonial)
+GalleryItemFields = partial_model(GalleryItem)
+BookingFields = partial_model(Booking)
+ContactMessageFields = partial_model(ContactMessage)
+
 # Response Models
 class MessageResponse(BaseModel):
     message: str
@@ -207,12 +245,52 @@ class ListResponse(BaseModel):
     page: int = 1
     per_page: int = 50
 
+class CursorListResponse(BaseModel):
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    per_page: int = 50
+    total: Optional[int] = None
+
+class TourPage(CursorListResponse):
+    items: List[Tour]
+
+class CoachPage(CursorListResponse):
+    items: List[Coach]
+
+class TestimonialPage(CursorListResponse):
+    items: List[Testimonial]
+
+class GalleryPage(CursorListResponse):
+    items: List[GalleryItem]
+
+class BookingPage(CursorListResponse):
+    items: List[Booking]
+
+class ContactMessagePage(CursorListResponse):
+    items: List[ContactMessage]
+
+class TourAvailability(BaseModel):
+    tour_id: str
+    capacity: Optional[int] = None
+    seats_taken: int = 0
+    seats_left: Optional[int] = None
+    available: bool
+
 # Statistics Models
+class StatsBucket(BaseModel):
+    count: int = 0
+    revenue: float = 0.0
+
 class BookingStats(BaseModel):
     total_bookings: int
     pending_bookings: int
     confirmed_bookings: int
     cancelled_bookings: int
+    total_revenue: float = 0.0
+    by_status: Dict[str, StatsBucket] = {}
+    by_tour: Dict[str, StatsBucket] = {}
+    by_month: Dict[str, StatsBucket] = {}
+    reconciled_at: Optional[datetime] = None
 
 class DashboardStats(BaseModel):
     total_tours: int
@@ -0,0 +1,122 @@
+"""
+Background delivery of outbox events (booking notifications)
+
+Bookings write their notification events to the outbox collection in the
+same request; OutboxWorker drains it in batches off the request path, with
+exponential backoff between attempts and a cap after which an event is
+marked failed.
+"""
+from typing import Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+
+from database import outbox_crud
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 20))
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", 2))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BACKOFF_SECONDS = float(os.environ.get("OUTBOX_BACKOFF_SECONDS", 5))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.environ.get("OUTBOX_MAX_BACKOFF_SECONDS", 3600))
+OUTBOX_LEASE_SECONDS = float(os.environ.get("OUTBOX_LEASE_SECONDS", 120))
+
+Handler = Callable[[dict], Awaitable[None]]
+
+def booking_notification_events(booking: dict) -> List[dict]:
+    """Outbox events for a newly created booking"""
+    payload = {
+        "booking_id": booking["id"],
+        "tour_id": booking["tour_id"],
+        "email": booking["email"],
+        "name": f"{booking['first_name']} {booking['last_name']}",
+        "participants": booking["participants"],
+        "total_price": booking.get("total_price", 0.0),
+    }
+    return [
+        {"type": "booking.confirmation_email", "payload": payload},
+        {"type": "booking.admin_alert", "payload": payload},
+    ]
+
+async def send_booking_confirmation(payload: dict):
+    # No mail transport is configured yet; delivery is logged
+    logger.info(f"Booking confirmation for {payload['booking_id']} to {payload['email']}")
+
+async def send_admin_alert(payload: dict):
+    logger.info(f"New booking {payload['booking_id']} for tour {payload['tour_id']} by {payload['name']}")
+
+DEFAULT_HANDLERS: Dict[str, Handler] = {
+    "booking.confirmation_email": send_booking_confirmation,
+    "booking.admin_alert": send_admin_alert,
+}
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff in seconds after the given number of attempts"""
+    return min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS)
+
+class OutboxWorker:
+    """Drains the outbox collection until stopped"""
+
+    def __init__(self, handlers: Optional[Dict[str, Handler]] = None, batch_size: int = OUTBOX_BATCH_SIZE):
+        self.handlers = handlers or DEFAULT_HANDLERS
+        self.batch_size = batch_size
+        self.delivered = 0
+        self.failed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self):
+        while True:
+            try:
+                processed = await self.drain_batch()
+            except Exception as e:
+                logger.error(f"Outbox worker error: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                await asyncio.sleep(OUTBOX_POLL_SECONDS)
+
+    async def drain_batch(self) -> int:
+        """Claim up to batch_size due events and deliver them concurrently"""
+        events = []
+        for _ in range(self.batch_size):
+            event = await outbox_crud.claim(OUTBOX_LEASE_SECONDS)
+            if event is None:
+                break
+            events.append(event)
+        await asyncio.gather(*(self.deliver(event) for event in events))
+        return len(events)
+
+    async def deliver(self, event: dict):
+        handler = self.handlers.get(event["type"])
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for outbox event type {event['type']}")
+            await handler(event["payload"])
+        except Exception as e:
+            if event["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+                logger.error(f"Giving up on outbox event {event['id']} after {event['attempts']} attempts: {e}")
+                self.failed += 1
+                await outbox_crud.reschedule(event["id"], str(e), None)
+            else:
+                retry_at = datetime.utcnow() + timedelta(seconds=backoff_delay(event["attempts"]))
+                await outbox_crud.reschedule(event["id"], str(e), retry_at)
+            return
+        self.delivered += 1
+        await outbox_crud.complete(event["id"])
+
+    def stats(self) -> dict:
+        return {"delivered": self.delivered, "failed": self.failed}
+
+outbox_worker = OutboxWorker()
@@ -0,0 +1,124 @@
+"""
+Connection pool monitoring for the Mongo client
+
+Motor runs pymongo's synchronous pool on executor threads, so the listener
+records when a thread starts waiting for a connection in thread-local state
+and measures the wait when the checkout completes. Counters are kept per
+server address and exposed through /api/health/db.
+"""
+from collections import deque
+from typing import Dict
+import threading
+import time
+
+from pymongo import monitoring
+
+RECENT_WAITS = 1000
+
+class PoolStats:
+    """Counters for one server's connection pool"""
+
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.pool_clears = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent_waits = deque(maxlen=RECENT_WAITS)
+
+    def snapshot(self) -> dict:
+        waits = sorted(self.recent_waits)
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 3) if waits else 0.0
+        return {
+            "open_connections": self.open,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "checkouts": self.checkouts,
+            "checkout_failures": dict(self.checkout_failures),
+            "pool_clears": self.pool_clears,
+            "wait_ms": {
+                "avg": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max": round(self.wait_max * 1000, 3),
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+            },
+        }
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks open/in-use connections and checkout wait times"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pools: Dict[str, PoolStats] = {}
+
+    def _pool(self, address) -> PoolStats:
+        key = "%s:%s" % address
+        if key not in self._pools:
+            self._pools[key] = PoolStats()
+        return self._pools[key]
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address).pool_clears += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address).open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.open = max(0, pool.open - 1)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self._lock:
+            failures = self._pool(event.address).checkout_failures
+            failures[event.reason] = failures.get(event.reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        wait = time.perf_counter() - started if started is not None else 0.0
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.in_use += 1
+            pool.max_in_use = max(pool.max_in_use, pool.in_use)
+            pool.checkouts += 1
+            pool.wait_total += wait
+            pool.wait_max = max(pool.wait_max, wait)
+            pool.recent_waits.append(wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool.in_use = max(0, pool.in_use - 1)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {address: pool.snapshot() for address, pool in self._pools.items()}
+
+pool_monitor = PoolMonitor()
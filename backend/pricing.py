@@ -0,0 +1,157 @@
+"""
+Booking prices
+
+Tours store a numeric base_price next to the display price ("от 1900").
+Booking totals are computed from a price table of every tour's base price,
+currency and start date, kept in the catalog cache and dropped on tour
+writes, so pricing a booking does not read the tour. Group discounts and an
+early-bird discount are configured through the environment and disabled
+by default.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from datetime import date, datetime
+import logging
+import os
+import re
+
+from cache import catalog_cache
+from database import tours_crud, projection_for
+
+logger = logging.getLogger(__name__)
+
+PRICE_PATTERN = re.compile(r"\d[\d\s.,]*")
+DATE_PATTERN = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{2,4})")
+
+def parse_discounts(value: str) -> List[Tuple[int, float]]:
+    """ "4:0.05,6:0.1" -> [(4, 0.05), (6, 0.1)], minimum participants to discount rate"""
+    rules = []
+    for rule in filter(None, (part.strip() for part in value.split(","))):
+        participants, rate = rule.split(":")
+        rules.append((int(participants), float(rate)))
+    return sorted(rules)
+
+PRICING_GROUP_DISCOUNTS = parse_discounts(os.environ.get("PRICING_GROUP_DISCOUNTS", ""))
+PRICING_EARLY_BIRD_DAYS = int(os.environ.get("PRICING_EARLY_BIRD_DAYS", 0))
+PRICING_EARLY_BIRD_DISCOUNT = float(os.environ.get("PRICING_EARLY_BIRD_DISCOUNT", 0))
+
+class TourPrice(NamedTuple):
+    base_price: float
+    currency: str
+    starts_on: Optional[date]
+
+def parse_price(display: str) -> float:
+    """Numeric price from a display string such as "от 1900", "1 900,50 €" or "1,900".
+
+    With both "," and "." the last one is the decimal separator. A lone separator
+    followed by exactly three digits, or a repeated one, separates thousands.
+    """
+    match = PRICE_PATTERN.search(display or "")
+    if not match:
+        raise ValueError(f"No price in {display!r}")
+    number = re.sub(r"\s", "", match.group()).rstrip(".,")
+    separators = [char for char in number if char in ".,"]
+    decimal = None
+    if len(set(separators)) == 2:
+        decimal = separators[-1]
+    elif len(separators) == 1 and len(number.partition(separators[0])[2]) != 3:
+        decimal = separators[0]
+    integer, fraction = number.rsplit(decimal, 1) if decimal else (number, "")
+    groups = re.split(r"[.,]", integer)
+    if (decimal and decimal in integer) or any(len(group) != 3 for group in groups[1:]) \
+            or (len(groups) > 1 and len(groups[0]) > 3):
+        raise ValueError(f"Malformed price in {display!r}")
+    return float("".join(groups) + (f".{fraction}" if fraction else ""))
+
+def parse_start_date(dates: str) -> Optional[date]:
+    """First date of a range such as "04.06.25 - 11.06.25" """
+    match = DATE_PATTERN.search(dates or "")
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    try:
+        return date(year + 2000 if year < 100 else year, month, day)
+    except ValueError:
+        return None
+
+def normalize_tour_price(data: dict) -> dict:
+    """Fill base_price from the display price when a write sets only the latter"""
+    if data.get("price") and data.get("base_price") is None:
+        data["base_price"] = parse_price(data["price"])
+    return data
+
+def tour_price(tour: dict) -> TourPrice:
+    base_price = tour.get("base_price")
+    if base_price is None:
+        base_price = parse_price(tour["price"])
+    return TourPrice(float(base_price), tour.get("currency") or "Euro", parse_start_date(tour.get("dates")))
+
+def _price_entries(tours: Iterable[dict]) -> Dict[str, TourPrice]:
+    table = {}
+    for tour in tours:
+        try:
+            table[tour["id"]] = tour_price(tour)
+        except (KeyError, ValueError) as e:
+            logger.warning(f"Tour {tour.get('id')} has no usable price: {e}")
+    return table
+
+PRICE_FIELDS = ["id", "base_price", "price", "currency", "dates"]
+
+async def price_table() -> Dict[str, TourPrice]:
+    """Prices of every tour, cached until a tour is written"""
+    key = tours_crud.cache_key("price_table")
+    table = catalog_cache.get(key)
+    if table is None:
+        tours = await tours_crud.collection.find({}, projection_for(PRICE_FIELDS)).to_list(length=None)
+        table = _price_entries(tours)
+        catalog_cache.set(key, table, tags=(tours_crud.collection_name,), ttl=tours_crud.cache_ttl)
+    return table
+
+async def prices_for(tour_ids: Iterable[str]) -> Dict[str, TourPrice]:
+    """Prices of the given tours, reading only tours the cached table lacks"""
+    table = await price_table()
+    wanted = set(tour_ids)
+    prices = {tour_id: table[tour_id] for tour_id in wanted if tour_id in table}
+    missing = wanted - prices.keys()
+    if missing:
+        # Tours created through another worker since the table was cached
+        tours = await tours_crud.get_many_by_ids(list(missing), fields=PRICE_FIELDS)
+        prices.update(_price_entries(tours.values()))
+    return prices
+
+def discount_rate(price: TourPrice, participants: int, booked_on: Optional[date] = None) -> float:
+    rate = 0.0
+    for min_participants, group_rate in PRICING_GROUP_DISCOUNTS:
+        if participants >= min_participants:
+            rate = group_rate
+    booked_on = booked_on or datetime.utcnow().date()
+    if PRICING_EARLY_BIRD_DISCOUNT and price.starts_on and (price.starts_on - booked_on).days >= PRICING_EARLY_BIRD_DAYS:
+        rate += PRICING_EARLY_BIRD_DISCOUNT
+    return min(rate, 1.0)
+
+def quote(price: TourPrice, participants: int, booked_on: Optional[date] = None) -> dict:
+    """Booking fields priced from a tour price"""
+    discount = discount_rate(price, participants, booked_on)
+    return {
+        "total_price": round(price.base_price * participants * (1 - discount), 2),
+        "currency": price.currency,
+    }
+
+async def quote_booking(tour_id: str, participants: int) -> Optional[dict]:
+    """Priced booking fields, None when the tour does not exist"""
+    price = (await prices_for([tour_id])).get(tour_id)
+    return quote(price, participants) if price else None
+
+async def backfill_tour_prices() -> int:
+    """Store base_price on tours that only have a display price"""
+    updated = 0
+    async for tour in tours_crud.collection.find({"base_price": {"$exists": False}}, projection_for(["id", "price"])):
+        try:
+            base_price = parse_price(tour.get("price"))
+        except ValueError:
+            logger.warning(f"Tour {tour['id']} has no parsable price: {tour.get('price')!r}")
+            continue
+        await tours_crud.collection.update_one({"id": tour["id"]}, {"$set": {"base_price": base_price}})
+        updated += 1
+    if updated:
+        tours_crud.invalidate_cache()
+    return updated
@@ -0,0 +1,93 @@
+"""
+Fast JSON responses for list endpoints
+
+Documents returned by BaseCRUD are already shaped like the response models,
+so validating them again through Pydantic and encoding with the stdlib
+encoder is wasted CPU on large listings. When FAST_JSON_RESPONSES is enabled
+list routes encode documents directly and reuse cached byte payloads.
+"""
+from typing import Any, Type
+from datetime import date, datetime
+from enum import Enum
+import json
+import os
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from cache import catalog_cache
+from compression import COMPRESSION_MIN_SIZE, accepted_encoding, compress
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+FAST_JSON_RESPONSES = os.environ.get("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Encode content to JSON bytes using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """JSON response that accepts content or pre-encoded bytes"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+class CachedPayload:
+    """Encoded JSON body kept in the cache together with its compressed variants"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.variants = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        """Body compressed with encoding, computed once per cache entry"""
+        if encoding not in self.variants:
+            self.variants[encoding] = compress(self.body, encoding)
+        return self.variants[encoding]
+
+def payload_response(payload: CachedPayload, headers: dict = None) -> FastJSONResponse:
+    """Serve a cached payload, pre-compressed when the client accepts it"""
+    headers = dict(headers or {})
+    encoding = accepted_encoding.get()
+    if encoding and len(payload.body) >= COMPRESSION_MIN_SIZE:
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+        return FastJSONResponse(payload.encoded(encoding), headers=headers)
+    return FastJSONResponse(payload.body, headers=headers)
+
+async def fast_list_response(query) -> FastJSONResponse:
+    """Encode the results of a FindQuery, reusing cached bytes for cached collections"""
+    crud = query.crud
+    if not crud.cache_ttl:
+        return FastJSONResponse(await query.to_list())
+
+    key = crud.cache_key("json", **query.cache_params())
+    payload = catalog_cache.get(key)
+    if payload is None:
+        payload = CachedPayload(dumps(await query.to_list()))
+        catalog_cache.set(key, payload, tags=(crud.collection_name,), ttl=crud.cache_ttl)
+    return payload_response(payload)
+
+def projected_response(model: Type[BaseModel], content: Any) -> FastJSONResponse:
+    """Validate projected documents against a partial model, emit only the fields present"""
+    def dump(doc: dict) -> dict:
+        return model.model_validate(doc).model_dump(mode="json", exclude_unset=True)
+
+    if isinstance(content, list):
+        return FastJSONResponse([dump(doc) for doc in content])
+    return FastJSONResponse(dump(content))
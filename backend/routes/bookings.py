@@ -1,28 +1,55 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from ..models import Booking, BookingCreate, BookingUpdate, BookingStatusUpdate, MessageResponse, BookingStats
-from ..database import bookings_crud, tours_crud
+from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import List, Optional, Dict, Any
+from datetime import datetime
+from ..models import Booking, BookingStatus, BookingCreate, BookingUpdate, BookingStatusUpdate, MessageResponse, BookingStats, BookingPage, BulkBookingResult, BulkBookingError, BookingFields, parse_fields
+from ..database import bookings_crud, EXPORT_READ_PREFERENCE, SeatsUnavailableError
+from ..outbox import booking_notification_events
+from ..pricing import prices_for, quote, quote_booking
+from ..exports import EXPORT_FORMATS, EXPORT_BATCH_SIZE, created_between, encode_export
+from ..responses import FAST_JSON_RESPONSES, fast_list_response, projected_response
 import logging
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 logger = logging.getLogger(__name__)
 
+BULK_MAX_ROWS = 1000
+BOOKING_EXPORT_FIELDS = [
+    "id", "tour_id", "first_name", "last_name", "email", "phone", "country",
+    "participants", "special_requests", "total_price", "currency", "status", "created_at", "updated_at"
+]
+BOOKING_SORT_FIELDS = ["created_at", "updated_at", "status", "tour_id", "total_price", "participants"]
+
 @router.get("/", response_model=List[Booking])
 async def get_bookings(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     status: Optional[str] = None,
-    tour_id: Optional[str] = None
+    tour_id: Optional[str] = None,
+    sort: Optional[str] = Query(None, description="Comma separated fields, prefix with - for descending"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return")
 ):
     """Get all bookings with optional filters"""
     try:
-        if status:
-            bookings = await bookings_crud.get_by_status(status)
-        elif tour_id:
-            bookings = await bookings_crud.get_by_tour(tour_id)
-        else:
-            bookings = await bookings_crud.get_all(skip=skip, limit=limit)
-        return bookings
+        projection = parse_fields(fields, Booking)
+        query = (
+            bookings_crud.query()
+            .where(status=status, tour_id=tour_id)
+            .sort(sort, allowed=BOOKING_SORT_FIELDS)
+            .skip(skip)
+            .limit(limit)
+            .project(projection)
+        )
+        
+        if FAST_JSON_RESPONSES:
+            return await fast_list_response(query)
+        docs = await query.to_list()
+        if projection:
+            return projected_response(BookingFields, docs)
+        return docs
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting bookings: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -37,16 +64,66 @@ async def get_booking_stats():
         logger.error(f"Error getting booking stats: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/page", response_model=BookingPage)
+async def get_bookings_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    status: Optional[str] = None,
+    tour_id: Optional[str] = None,
+    include_total: bool = False
+):
+    """Get a page of bookings, newest first, using cursor pagination"""
+    try:
+        filters = {}
+        if status:
+            filters["status"] = status
+        if tour_id:
+            filters["tour_id"] = tour_id
+        return await bookings_crud.get_page(
+            cursor=cursor, limit=limit, filters=filters or None, include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting bookings page: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/export")
+async def export_bookings(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    tour_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """Stream bookings as NDJSON or CSV, oldest first"""
+    filters = bookings_crud.query().where(
+        status=status,
+        tour_id=tour_id,
+        created_at=created_between(created_from, created_to)
+    ).filters
+    docs = bookings_crud.iter_documents(filters, batch_size=EXPORT_BATCH_SIZE, read_preference=EXPORT_READ_PREFERENCE)
+    return StreamingResponse(
+        encode_export(docs, format, BOOKING_EXPORT_FIELDS),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="bookings.{format}"'}
+    )
+
 @router.get("/{booking_id}", response_model=Booking)
-async def get_booking(booking_id: str):
+async def get_booking(booking_id: str, fields: Optional[str] = Query(None, description="Comma separated fields to return")):
     """Get booking by ID"""
     try:
-        booking = await bookings_crud.get_by_id(booking_id)
+        projection = parse_fields(fields, Booking)
+        booking = await bookings_crud.get_by_id(booking_id, fields=projection)
         if not booking:
             raise HTTPException(status_code=404, detail="Booking not found")
+        if projection:
+            return projected_response(BookingFields, booking)
         return booking
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting booking {booking_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -55,70 +132,115 @@ async def get_booking(booking_id: str):
 async def create_booking(booking: BookingCreate):
     """Create new booking"""
     try:
-        # Validate tour exists
-        tour = await tours_crud.get_by_id(booking.tour_id)
-        if not tour:
+        # Priced from the cached price table, which also validates the tour
+        price = await quote_booking(booking.tour_id, booking.participants)
+        if not price:
             raise HTTPException(status_code=404, detail="Tour not found")
         
-        # Calculate total price
-        base_price = float(tour["price"].replace("от ", ""))
-        total_price = base_price * booking.participants
-        
         booking_data = booking.dict()
-        booking_data["total_price"] = total_price
+        booking_data.update(price)
         
-        created_booking = await bookings_crud.create(booking_data)
+        # Notifications are delivered by the outbox worker, not in this request
+        created_booking = await bookings_crud.create_with_outbox(booking_data, booking_notification_events)
         return created_booking
     except HTTPException:
         raise
+    except SeatsUnavailableError as e:
+        raise HTTPException(status_code=409, detail=e.message)
     except Exception as e:
         logger.error(f"Error creating booking: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/bulk", response_model=BulkBookingResult)
+async def create_bookings_bulk(rows: List[Dict[str, Any]] = Body(...)):
+    """Create many bookings at once, reporting errors per row"""
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows per request")
+    try:
+        errors = []
+        valid = []
+        for index, row in enumerate(rows):
+            try:
+                valid.append((index, BookingCreate.model_validate(row)))
+            except ValidationError as e:
+                message = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+                errors.append(BulkBookingError(index=index, error=message))
+        
+        prices = await prices_for(booking.tour_id for _, booking in valid)
+        
+        docs = []
+        doc_rows = []
+        for index, booking in valid:
+            price = prices.get(booking.tour_id)
+            if not price:
+                errors.append(BulkBookingError(index=index, error="Tour not found"))
+                continue
+            booking_data = booking.dict()
+            booking_data.update(quote(price, booking.participants))
+            booking_data["status"] = BookingStatus.PENDING.value
+            docs.append(booking_data)
+            doc_rows.append(index)
+        
+        created, write_errors = await bookings_crud.create_many_with_outbox(docs, booking_notification_events)
+        for batch_index, error in write_errors.items():
+            errors.append(BulkBookingError(index=doc_rows[batch_index], error=error))
+        
+        return BulkBookingResult(
+            created=len(created),
+            ids=[doc["id"] for doc in created],
+            errors=sorted(errors, key=lambda error: error.index)
+        )
+    except Exception as e:
+        logger.error(f"Error creating bookings in bulk: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.put("/{booking_id}", response_model=Booking)
 async def update_booking(booking_id: str, booking: BookingUpdate):
     """Update booking"""
     try:
-        # Check if booking exists
-        existing_booking = await bookings_crud.get_by_id(booking_id)
-        if not existing_booking:
-            raise HTTPException(status_code=404, detail="Booking not found")
-        
         booking_data = booking.dict(exclude_unset=True)
         
         # Recalculate total price if participants or tour changed
         if "participants" in booking_data or "tour_id" in booking_data:
-            tour_id = booking_data.get("tour_id", existing_booking["tour_id"])
-            participants = booking_data.get("participants", existing_booking["participants"])
+            tour_id = booking_data.get("tour_id")
+            participants = booking_data.get("participants")
+            if tour_id is None or participants is None:
+                # Only read the stored booking when the request lacks one of the inputs
+                existing_booking = await bookings_crud.get_by_id(booking_id, fields=["tour_id", "participants"])
+                if not existing_booking:
+                    raise HTTPException(status_code=404, detail="Booking not found")
+                tour_id = tour_id or existing_booking["tour_id"]
+                participants = participants or existing_booking["participants"]
             
-            tour = await tours_crud.get_by_id(tour_id)
-            if not tour:
+            price = await quote_booking(tour_id, participants)
+            if not price:
                 raise HTTPException(status_code=404, detail="Tour not found")
-            
-            base_price = float(tour["price"].replace("от ", ""))
-            booking_data["total_price"] = base_price * participants
+            booking_data.update(price)
         
         updated_booking = await bookings_crud.update(booking_id, booking_data)
+        if not updated_booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
         return updated_booking
     except HTTPException:
         raise
+    except SeatsUnavailableError as e:
+        raise HTTPException(status_code=409, detail=e.message)
     except Exception as e:
         logger.error(f"Error updating booking {booking_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.put("/{booking_id}/status", response_model=Booking)
 async def update_booking_status(booking_id: str, status_update: BookingStatusUpdate):
-    """Update booking status"""
+    """Update booking status, cancelling gives the booking's seats back"""
     try:
-        # Check if booking exists
-        existing_booking = await bookings_crud.get_by_id(booking_id)
-        if not existing_booking:
+        updated_booking = await bookings_crud.update(booking_id, {"status": status_update.status.value})
+        if not updated_booking:
             raise HTTPException(status_code=404, detail="Booking not found")
-        
-        updated_booking = await bookings_crud.update(booking_id, {"status": status_update.status})
         return updated_booking
     except HTTPException:
         raise
+    except SeatsUnavailableError as e:
+        raise HTTPException(status_code=409, detail=e.message)
     except Exception as e:
         logger.error(f"Error updating booking status {booking_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -127,14 +249,9 @@ async def update_booking_status(booking_id: str, status_update: BookingStatusUpd
 async def delete_booking(booking_id: str):
     """Delete booking"""
     try:
-        # Check if booking exists
-        existing_booking = await bookings_crud.get_by_id(booking_id)
-        if not existing_booking:
-            raise HTTPException(status_code=404, detail="Booking not found")
-        
         success = await bookings_crud.delete(booking_id)
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete booking")
+            raise HTTPException(status_code=404, detail="Booking not found")
         
         return MessageResponse(message="Booking deleted successfully")
     except HTTPException:
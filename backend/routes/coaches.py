@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import List
-from ..models import Coach, CoachCreate, CoachUpdate, MessageResponse
+from typing import List, Optional
+from ..models import Coach, CoachCreate, CoachUpdate, MessageResponse, CoachPage, CoachFields, parse_fields
 from ..database import coaches_crud
+from ..responses import FAST_JSON_RESPONSES, fast_list_response, projected_response
 import logging
 
 router = APIRouter(prefix="/coaches", tags=["coaches"])
@@ -10,26 +11,57 @@ logger = logging.getLogger(__name__)
 @router.get("/", response_model=List[Coach])
 async def get_coaches(
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
+    limit: int = Query(100, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return")
 ):
     """Get all coaches"""
     try:
-        coaches = await coaches_crud.get_all(skip=skip, limit=limit)
-        return coaches
+        projection = parse_fields(fields, Coach)
+        query = coaches_crud.query().skip(skip).limit(limit).project(projection)
+        
+        if FAST_JSON_RESPONSES:
+            return await fast_list_response(query)
+        docs = await query.to_list()
+        if projection:
+            return projected_response(CoachFields, docs)
+        return docs
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting coaches: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/page", response_model=CoachPage)
+async def get_coaches_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    include_total: bool = False
+):
+    """Get a page of coaches, newest first, using cursor pagination"""
+    try:
+        filters = None
+        return await coaches_crud.get_page(cursor=cursor, limit=limit, filters=filters, include_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting coaches page: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/{coach_id}", response_model=Coach)
-async def get_coach(coach_id: str):
+async def get_coach(coach_id: str, fields: Optional[str] = Query(None, description="Comma separated fields to return")):
     """Get coach by ID"""
     try:
-        coach = await coaches_crud.get_by_id(coach_id)
+        projection = parse_fields(fields, Coach)
+        coach = await coaches_crud.get_by_id(coach_id, fields=projection)
         if not coach:
             raise HTTPException(status_code=404, detail="Coach not found")
+        if projection:
+            return projected_response(CoachFields, coach)
         return coach
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting coach {coach_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -49,13 +81,10 @@ async def create_coach(coach: CoachCreate):
 async def update_coach(coach_id: str, coach: CoachUpdate):
     """Update coach"""
     try:
-        # Check if coach exists
-        existing_coach = await coaches_crud.get_by_id(coach_id)
-        if not existing_coach:
-            raise HTTPException(status_code=404, detail="Coach not found")
-        
         coach_data = coach.dict(exclude_unset=True)
         updated_coach = await coaches_crud.update(coach_id, coach_data)
+        if not updated_coach:
+            raise HTTPException(status_code=404, detail="Coach not found")
         return updated_coach
     except HTTPException:
         raise
@@ -67,14 +96,9 @@ async def update_coach(coach_id: str, coach: CoachUpdate):
 async def delete_coach(coach_id: str):
     """Delete coach"""
     try:
-        # Check if coach exists
-        existing_coach = await coaches_crud.get_by_id(coach_id)
-        if not existing_coach:
-            raise HTTPException(status_code=404, detail="Coach not found")
-        
         success = await coaches_crud.delete(coach_id)
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete coach")
+            raise HTTPException(status_code=404, detail="Coach not found")
         
         return MessageResponse(message="Coach deleted successfully")
     except HTTPException:
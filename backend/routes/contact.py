@@ -1,19 +1,41 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
-from ..models import ContactMessage, ContactCreate, MessageResponse
-from ..database import contacts_crud
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+from ..models import ContactMessage, ContactCreate, MessageResponse, ContactMessagePage, ContactMessageFields, parse_fields
+from ..database import contacts_crud, EXPORT_READ_PREFERENCE
+from ..contact_queue import client_ip, contact_queue, contact_rate_limiter
+from ..exports import EXPORT_FORMATS, EXPORT_BATCH_SIZE, created_between, encode_export
+from ..responses import FAST_JSON_RESPONSES, fast_list_response, projected_response
 import logging
 
 router = APIRouter(prefix="/contact", tags=["contact"])
 logger = logging.getLogger(__name__)
 
+CONTACT_EXPORT_FIELDS = ["id", "name", "email", "phone", "subject", "message", "read", "created_at", "updated_at"]
+CONTACT_SORT_FIELDS = ["created_at", "updated_at", "read", "email"]
+
 @router.post("/", response_model=MessageResponse)
-async def create_contact_message(contact: ContactCreate):
+async def create_contact_message(contact: ContactCreate, request: Request):
     """Create new contact message"""
     try:
+        ip = client_ip(request)
+        if not contact_rate_limiter.allow(ip):
+            raise HTTPException(
+                status_code=429,
+                detail="Too many messages, please try again later",
+                headers={"Retry-After": str(contact_rate_limiter.retry_after(ip))}
+            )
+        
         contact_data = contact.dict()
-        await contacts_crud.create(contact_data)
+        # Write directly while the queue cannot store its batches, so a failure reaches the client
+        if not contact_queue.running or contact_queue.failing:
+            await contacts_crud.create(contact_data)
+        elif not contact_queue.submit(contact_data):
+            raise HTTPException(status_code=503, detail="Service busy, please try again later", headers={"Retry-After": "5"})
         return MessageResponse(message="Message sent successfully")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating contact message: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -22,29 +44,90 @@ async def create_contact_message(contact: ContactCreate):
 async def get_contact_messages(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    unread_only: bool = Query(False, description="Get only unread messages")
+    unread_only: bool = Query(False, description="Get only unread messages"),
+    sort: Optional[str] = Query(None, description="Comma separated fields, prefix with - for descending"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return")
 ):
     """Get all contact messages (admin only)"""
     try:
+        projection = parse_fields(fields, ContactMessage)
+        query = (
+            contacts_crud.query()
+            .sort(sort, allowed=CONTACT_SORT_FIELDS)
+            .skip(skip)
+            .limit(limit)
+            .project(projection)
+        )
         if unread_only:
-            messages = await contacts_crud.get_unread()
-        else:
-            messages = await contacts_crud.get_all(skip=skip, limit=limit)
-        return messages
+            query.where(read=False)
+        
+        if FAST_JSON_RESPONSES:
+            return await fast_list_response(query)
+        docs = await query.to_list()
+        if projection:
+            return projected_response(ContactMessageFields, docs)
+        return docs
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting contact messages: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/page", response_model=ContactMessagePage)
+async def get_contact_messages_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    unread_only: bool = Query(False, description="Get only unread messages"),
+    include_total: bool = False
+):
+    """Get a page of contact messages, newest first, using cursor pagination"""
+    try:
+        filters = {"read": False} if unread_only else None
+        return await contacts_crud.get_page(cursor=cursor, limit=limit, filters=filters, include_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting contact messages page: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@router.get("/export")
+async def export_contact_messages(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    unread_only: bool = Query(False, description="Export only unread messages"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """Stream contact messages as NDJSON or CSV, oldest first"""
+    query = contacts_crud.query().where(created_at=created_between(created_from, created_to))
+    if unread_only:
+        query.where(read=False)
+    docs = contacts_crud.iter_documents(query.filters, batch_size=EXPORT_BATCH_SIZE, read_preference=EXPORT_READ_PREFERENCE)
+    return StreamingResponse(
+        encode_export(docs, format, CONTACT_EXPORT_FIELDS),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'}
+    )
+
+@router.get("/queue")
+async def get_contact_queue_stats():
+    """Get depth and throughput of the contact message write queue"""
+    return contact_queue.stats()
+
 @router.get("/{message_id}", response_model=ContactMessage)
-async def get_contact_message(message_id: str):
+async def get_contact_message(message_id: str, fields: Optional[str] = Query(None, description="Comma separated fields to return")):
     """Get contact message by ID"""
     try:
-        message = await contacts_crud.get_by_id(message_id)
+        projection = parse_fields(fields, ContactMessage)
+        message = await contacts_crud.get_by_id(message_id, fields=projection)
         if not message:
             raise HTTPException(status_code=404, detail="Message not found")
+        if projection:
+            return projected_response(ContactMessageFields, message)
         return message
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting contact message {message_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -53,14 +136,9 @@ async def get_contact_message(message_id: str):
 async def mark_message_as_read(message_id: str):
     """Mark message as read"""
     try:
-        # Check if message exists
-        existing_message = await contacts_crud.get_by_id(message_id)
-        if not existing_message:
-            raise HTTPException(status_code=404, detail="Message not found")
-        
         success = await contacts_crud.mark_as_read(message_id)
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to mark message as read")
+            raise HTTPException(status_code=404, detail="Message not found")
         
         return MessageResponse(message="Message marked as read")
     except HTTPException:
@@ -73,14 +151,9 @@ async def mark_message_as_read(message_id: str):
 async def delete_contact_message(message_id: str):
     """Delete contact message"""
     try:
-        # Check if message exists
-        existing_message = await contacts_crud.get_by_id(message_id)
-        if not existing_message:
-            raise HTTPException(status_code=404, detail="Message not found")
-        
         success = await contacts_crud.delete(message_id)
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete message")
+            raise HTTPException(status_code=404, detail="Message not found")
         
         return MessageResponse(message="Message deleted successfully")
     except HTTPException:
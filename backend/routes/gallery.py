@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from ..models import GalleryItem, GalleryItemCreate, GalleryItemUpdate, MessageResponse
+from ..models import GalleryItem, GalleryItemCreate, GalleryItemUpdate, MessageResponse, GalleryPage, GalleryItemFields, parse_fields
 from ..database import gallery_crud
+from ..responses import FAST_JSON_RESPONSES, fast_list_response, projected_response
 import logging
 
 router = APIRouter(prefix="/gallery", tags=["gallery"])
@@ -11,29 +12,58 @@ logger = logging.getLogger(__name__)
 async def get_gallery_items(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma separated fields to return")
 ):
     """Get all gallery items with optional category filter"""
     try:
-        if category:
-            items = await gallery_crud.get_by_category(category)
-        else:
-            items = await gallery_crud.get_all(skip=skip, limit=limit)
-        return items
+        projection = parse_fields(fields, GalleryItem)
+        query = gallery_crud.query().where(category=category).skip(skip).limit(limit).project(projection)
+        
+        if FAST_JSON_RESPONSES:
+            return await fast_list_response(query)
+        docs = await query.to_list()
+        if projection:
+            return projected_response(GalleryItemFields, docs)
+        return docs
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting gallery items: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/page", response_model=GalleryPage)
+async def get_gallery_items_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    category: Optional[str] = None,
+    include_total: bool = False
+):
+    """Get a page of gallery items, newest first, using cursor pagination"""
+    try:
+        filters = {"category": category} if category else None
+        return await gallery_crud.get_page(cursor=cursor, limit=limit, filters=filters, include_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting gallery items page: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/{item_id}", response_model=GalleryItem)
-async def get_gallery_item(item_id: str):
+async def get_gallery_item(item_id: str, fields: Optional[str] = Query(None, description="Comma separated fields to return")):
     """Get gallery item by ID"""
     try:
-        item = await gallery_crud.get_by_id(item_id)
+        projection = parse_fields(fields, GalleryItem)
+        item = await gallery_crud.get_by_id(item_id, fields=projection)
         if not item:
             raise HTTPException(status_code=404, detail="Gallery item not found")
+        if projection:
+            return projected_response(GalleryItemFields, item)
         return item
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting gallery item {item_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -53,13 +83,10 @@ async def create_gallery_item(item: GalleryItemCreate):
 async def update_gallery_item(item_id: str, item: GalleryItemUpdate):
     """Update gallery item"""
     try:
-        # Check if item exists
-        existing_item = await gallery_crud.get_by_id(item_id)
-        if not existing_item:
-            raise HTTPException(status_code=404, detail="Gallery item not found")
-        
         item_data = item.dict(exclude_unset=True)
         updated_item = await gallery_crud.update(item_id, item_data)
+        if not updated_item:
+            raise HTTPException(status_code=404, detail="Gallery item not found")
         return updated_item
     except HTTPException:
         raise
@@ -71,14 +98,9 @@ async def update_gallery_item(item_id: str, item: GalleryItemUpdate):
 async def delete_gallery_item(item_id: str):
     """Delete gallery item"""
     try:
-        # Check if item exists
-        existing_item = await gallery_crud.get_by_id(item_id)
-        if not existing_item:
-            raise HTTPException(status_code=404, detail="Gallery item not found")
-        
         success = await gallery_crud.delete(item_id)
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete gallery item")
+            raise HTTPException(status_code=404, detail="Gallery item not found")
         
         return MessageResponse(message="Gallery item deleted successfully")
     except HTTPException:
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+from typing import Optional
+import asyncio
+import hashlib
+import logging
+from ..cache import catalog_cache
+from ..conditional import is_not_modified
+from ..database import tours_crud, coaches_crud, testimonials_crud, gallery_crud, settings_crud, CATALOG_CACHE_TTL
+from ..responses import CachedPayload, dumps, payload_response
+
+router = APIRouter(prefix="/home", tags=["home"])
+logger = logging.getLogger(__name__)
+
+# Section name -> (collection it is read from, loader)
+HOME_SECTIONS = {
+    "tours": (tours_crud, lambda: tours_crud.get_all()),
+    "coaches": (coaches_crud, lambda: coaches_crud.get_all()),
+    "testimonials": (testimonials_crud, lambda: testimonials_crud.get_approved()),
+    "gallery": (gallery_crud, lambda: gallery_crud.get_all()),
+    "settings": (settings_crud, lambda: settings_crud.get_settings()),
+}
+HOME_CACHE_CONTROL = "public, max-age=60"
+
+def parse_sections(include: Optional[str]) -> list:
+    """Requested sections in canonical order, raise ValueError for unknown names"""
+    if not include:
+        return list(HOME_SECTIONS)
+    requested = {section.strip() for section in include.split(",") if section.strip()}
+    unknown = requested - set(HOME_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+    return [section for section in HOME_SECTIONS if section in requested]
+
+async def build_payload(sections: list) -> tuple:
+    """Read every section concurrently, return the encoded payload and its ETag"""
+    results = await asyncio.gather(*(HOME_SECTIONS[section][1]() for section in sections))
+    body = dumps(dict(zip(sections, results)))
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    return CachedPayload(body), etag
+
+@router.get("/")
+async def get_home(
+    request: Request,
+    include: Optional[str] = Query(None, description="Comma separated sections: tours, coaches, testimonials, gallery, settings")
+):
+    """Everything the home page needs in one response"""
+    try:
+        sections = parse_sections(include)
+        key = ("home", ",".join(sections))
+        cached = catalog_cache.get(key)
+        if cached is None:
+            cached = await build_payload(sections)
+            tags = [HOME_SECTIONS[section][0].collection_name for section in sections]
+            catalog_cache.set(key, cached, tags=tags, ttl=CATALOG_CACHE_TTL)
+        payload, etag = cached
+        
+        headers = {"ETag": etag, "Cache-Control": HOME_CACHE_CONTROL}
+        if is_not_modified(request, etag, None):
+            return Response(status_code=304, headers=headers)
+        return payload_response(payload, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting home page data: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import List
-from ..models import Testimonial, TestimonialCreate, TestimonialUpdate, MessageResponse
+from typing import List, Optional
+from ..models import Testimonial, TestimonialCreate, TestimonialUpdate, MessageResponse, TestimonialPage, TestimonialFields, parse_fields
 from ..database import testimonials_crud
+from ..responses import FAST_JSON_RESPONSES, fast_list_response, projected_response
 import logging
 
 router = APIRouter(prefix="/testimonials", tags=["testimonials"])
@@ -11,29 +12,60 @@ logger = logging.getLogger(__name__)
 async def get_testimonials(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    approved_only: bool = Query(True, description="Get only approved testimonials")
+    approved_only: bool = Query(True, description="Get only approved testimonials"),
+    fields: Optional[str] = Query(None, description="Comma separated fields to return")
 ):
     """Get all testimonials"""
     try:
+        projection = parse_fields(fields, Testimonial)
+        query = testimonials_crud.query().skip(skip).limit(limit).project(projection)
         if approved_only:
-            testimonials = await testimonials_crud.get_approved()
-        else:
-            testimonials = await testimonials_crud.get_all(skip=skip, limit=limit)
-        return testimonials
+            query.where(approved=True)
+        
+        if FAST_JSON_RESPONSES:
+            return await fast_list_response(query)
+        docs = await query.to_list()
+        if projection:
+            return projected_response(TestimonialFields, docs)
+        return docs
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting testimonials: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/page", response_model=TestimonialPage)
+async def get_testimonials_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    approved_only: bool = Query(True, description="Get only approved testimonials"),
+    include_total: bool = False
+):
+    """Get a page of testimonials, newest first, using cursor pagination"""
+    try:
+        filters = {"approved": True} if approved_only else None
+        return await testimonials_crud.get_page(cursor=cursor, limit=limit, filters=filters, include_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting testimonials page: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/{testimonial_id}", response_model=Testimonial)
-async def get_testimonial(testimonial_id: str):
+async def get_testimonial(testimonial_id: str, fields: Optional[str] = Query(None, description="Comma separated fields to return")):
     """Get testimonial by ID"""
     try:
-        testimonial = await testimonials_crud.get_by_id(testimonial_id)
+        projection = parse_fields(fields, Testimonial)
+        testimonial = await testimonials_crud.get_by_id(testimonial_id, fields=projection)
         if not testimonial:
             raise HTTPException(status_code=404, detail="Testimonial not found")
+        if projection:
+            return projected_response(TestimonialFields, testimonial)
         return testimonial
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting testimonial {testimonial_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -55,13 +87,10 @@ async def create_testimonial(testimonial: TestimonialCreate):
 async def update_testimonial(testimonial_id: str, testimonial: TestimonialUpdate):
     """Update testimonial"""
     try:
-        # Check if testimonial exists
-        existing_testimonial = await testimonials_crud.get_by_id(testimonial_id)
-        if not existing_testimonial:
-            raise HTTPException(status_code=404, detail="Testimonial not found")
-        
         testimonial_data = testimonial.dict(exclude_unset=True)
         updated_testimonial = await testimonials_crud.update(testimonial_id, testimonial_data)
+        if not updated_testimonial:
+            raise HTTPException(status_code=404, detail="Testimonial not found")
         return updated_testimonial
     except HTTPException:
         raise
@@ -73,14 +102,9 @@ async def update_testimonial(testimonial_id: str, testimonial: TestimonialUpdate
 async def delete_testimonial(testimonial_id: str):
     """Delete testimonial"""
     try:
-        # Check if testimonial exists
-        existing_testimonial = await testimonials_crud.get_by_id(testimonial_id)
-        if not existing_testimonial:
-            raise HTTPException(status_code=404, detail="Testimonial not found")
-        
         success = await testimonials_crud.delete(testimonial_id)
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete testimonial")
+            raise HTTPException(status_code=404, detail="Testimonial not found")
         
         return MessageResponse(message="Testimonial deleted successfully")
     except HTTPException:
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from ..models import Tour, TourCreate, TourUpdate, MessageResponse
-from ..database import tours_crud
+from ..models import Tour, TourCreate, TourUpdate, MessageResponse, TourPage, TourFields, TourAvailability, parse_fields
+from ..database import tours_crud, bookings_crud
+from ..pricing import normalize_tour_price
+from ..responses import FAST_JSON_RESPONSES, fast_list_response, projected_response
 import logging
 
 router = APIRouter(prefix="/tours", tags=["tours"])
@@ -11,40 +13,85 @@ logger = logging.getLogger(__name__)
 async def get_tours(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    level: Optional[str] = None
+    level: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma separated fields to return")
 ):
     """Get all tours with optional level filter"""
     try:
-        if level:
-            tours = await tours_crud.get_by_level(level)
-        else:
-            tours = await tours_crud.get_all(skip=skip, limit=limit)
-        return tours
+        projection = parse_fields(fields, Tour)
+        query = tours_crud.query().where(level=level).skip(skip).limit(limit).project(projection)
+        
+        if FAST_JSON_RESPONSES:
+            return await fast_list_response(query)
+        docs = await query.to_list()
+        if projection:
+            return projected_response(TourFields, docs)
+        return docs
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting tours: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/page", response_model=TourPage)
+async def get_tours_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    level: Optional[str] = None,
+    include_total: bool = False
+):
+    """Get a page of tours, newest first, using cursor pagination"""
+    try:
+        filters = {"level": level} if level else None
+        return await tours_crud.get_page(cursor=cursor, limit=limit, filters=filters, include_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting tours page: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/{tour_id}", response_model=Tour)
-async def get_tour(tour_id: str):
+async def get_tour(tour_id: str, fields: Optional[str] = Query(None, description="Comma separated fields to return")):
     """Get tour by ID"""
     try:
-        tour = await tours_crud.get_by_id(tour_id)
+        projection = parse_fields(fields, Tour)
+        tour = await tours_crud.get_by_id(tour_id, fields=projection)
         if not tour:
             raise HTTPException(status_code=404, detail="Tour not found")
+        if projection:
+            return projected_response(TourFields, tour)
         return tour
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting tour {tour_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/{tour_id}/availability", response_model=TourAvailability)
+async def get_tour_availability(tour_id: str):
+    """Seats left on a tour, read from its seat counter rather than counting bookings"""
+    try:
+        availability = await bookings_crud.get_availability(tour_id)
+        if not availability:
+            raise HTTPException(status_code=404, detail="Tour not found")
+        return availability
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting availability of tour {tour_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.post("/", response_model=Tour)
 async def create_tour(tour: TourCreate):
     """Create new tour"""
     try:
-        tour_data = tour.dict()
+        tour_data = normalize_tour_price(tour.dict())
         created_tour = await tours_crud.create(tour_data)
         return created_tour
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error creating tour: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -53,16 +100,17 @@ async def create_tour(tour: TourCreate):
 async def update_tour(tour_id: str, tour: TourUpdate):
     """Update tour"""
     try:
-        # Check if tour exists
-        existing_tour = await tours_crud.get_by_id(tour_id)
-        if not existing_tour:
-            raise HTTPException(status_code=404, detail="Tour not found")
-        
-        tour_data = tour.dict(exclude_unset=True)
+        tour_data = normalize_tour_price(tour.dict(exclude_unset=True))
         updated_tour = await tours_crud.update(tour_id, tour_data)
+        if not updated_tour:
+            raise HTTPException(status_code=404, detail="Tour not found")
+        if tour_data.get("capacity") is not None:
+            await bookings_crud.set_capacity(tour_id, tour_data["capacity"])
         return updated_tour
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error updating tour {tour_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -71,16 +119,11 @@ async def update_tour(tour_id: str, tour: TourUpdate):
 async def delete_tour(tour_id: str):
     """Delete tour"""
     try:
-        # Check if tour exists
-        existing_tour = await tours_crud.get_by_id(tour_id)
-        if not existing_tour:
-            raise HTTPException(status_code=404, detail="Tour not found")
-        
         # TODO: Check if tour has bookings before deletion
         
         success = await tours_crud.delete(tour_id)
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete tour")
+            raise HTTPException(status_code=404, detail="Tour not found")
         
         return MessageResponse(message="Tour deleted successfully")
     except HTTPException:
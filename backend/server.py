@@ -1,22 +1,35 @@
 from fastapi import FastAPI, APIRouter, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 import os
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
+import asyncio
+
+# Load environment variables before the modules below read their settings
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
 
 # Import database functions
-from database import connect_to_mongo, close_mongo_connection
+from database import (
+    connect_to_mongo, close_mongo_connection, run_stats_reconciliation, mongo_client_options,
+    tours_crud, coaches_crud, testimonials_crud, gallery_crud, settings_crud
+)
+from cache import catalog_cache
+from pool_monitor import pool_monitor
+from metrics import MetricsMiddleware, render_metrics
+from conditional import ConditionalRequestMiddleware
+from compression import CompressionMiddleware
+from outbox import outbox_worker
+from contact_queue import contact_queue
+from pricing import backfill_tour_prices
 
 # Import route modules
-from routes import tours, coaches, testimonials, gallery, bookings, contact, settings
+from routes import tours, coaches, testimonials, gallery, bookings, contact, settings, home
 from data_seeder import seed_database
 
-# Load environment variables
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,23 +37,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SEED_IN_BACKGROUND = os.environ.get("SEED_IN_BACKGROUND", "false").lower() in ("1", "true", "yes")
+
+async def seed_database_safely():
+    try:
+        await seed_database()
+    except Exception as e:
+        logger.warning(f"Database seeding failed: {e}")
+
 # Lifespan manager for startup and shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up...")
     await connect_to_mongo()
+    backfilled = await backfill_tour_prices()
+    if backfilled:
+        logger.info(f"Stored numeric prices for {backfilled} tours")
     
-    # Seed database with initial data
-    try:
-        await seed_database()
-    except Exception as e:
-        logger.warning(f"Database seeding failed: {e}")
+    # Seed database with initial data, optionally without delaying startup
+    seed_task = None
+    if SEED_IN_BACKGROUND:
+        seed_task = asyncio.create_task(seed_database_safely())
+    else:
+        await seed_database_safely()
+    
+    # Keep materialized booking stats in line with the bookings collection
+    stats_task = asyncio.create_task(
+        run_stats_reconciliation(float(os.environ.get("STATS_RECONCILE_SECONDS", 3600)))
+    )
+    # Deliver booking notifications off the request path
+    outbox_worker.start()
+    # Batch contact form writes
+    contact_queue.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    stats_task.cancel()
+    if seed_task and not seed_task.done():
+        seed_task.cancel()
+    await outbox_worker.stop()
+    await contact_queue.stop()
     await close_mongo_connection()
 
 # Create FastAPI app
@@ -63,6 +102,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Validators and Cache-Control for public catalog routes
+app.add_middleware(
+    ConditionalRequestMiddleware,
+    rules=[
+        ("/api/tours", [tours_crud], "public, max-age=60"),
+        ("/api/coaches", [coaches_crud], "public, max-age=300"),
+        ("/api/testimonials", [testimonials_crud], "public, max-age=300"),
+        ("/api/gallery", [gallery_crud], "public, max-age=300"),
+        ("/api/settings", [settings_crud], "public, max-age=300"),
+    ],
+    # Seat counters change with every booking, not with the tours collection
+    live_suffixes=["/availability"],
+)
+
+# Compress responses, wrapping every middleware but the metrics one
+app.add_middleware(CompressionMiddleware)
+
+# Time requests end to end, added last so it sees the full latency
+app.add_middleware(MetricsMiddleware)
+
 # Health check endpoint
 @api_router.get("/")
 async def root():
@@ -72,6 +131,23 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "Padel Tour Academia API"}
 
+@api_router.get("/health/db")
+async def database_health():
+    """Mongo connection pool state and checkout wait times"""
+    return {
+        "options": mongo_client_options(),
+        "pools": pool_monitor.stats(),
+    }
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/cache/stats")
+async def cache_stats():
+    return catalog_cache.stats()
+
 # Include route modules
 api_router.include_router(tours.router)
 api_router.include_router(coaches.router)
@@ -80,6 +156,7 @@ api_router.include_router(gallery.router)
 api_router.include_router(bookings.router)
 api_router.include_router(contact.router)
 api_router.include_router(settings.router)
+api_router.include_router(home.router)
 
 # Include the API router in the main app
 app.include_router(api_router)
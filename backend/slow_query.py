@@ -0,0 +1,179 @@
+"""
+Slow query log with explain plans
+
+A command listener catches reads and writes that take longer than
+SLOW_QUERY_MS. A sample of them (SLOW_QUERY_SAMPLE_RATE) is explained on the
+event loop and logged as one JSON line with the collection, duration, query
+shape and whether the winning plan scanned the collection or used an index.
+Plans are cached per query shape so a hot slow query is explained once per
+SLOW_QUERY_EXPLAIN_TTL seconds, not on every execution; the cache keeps at
+most SLOW_QUERY_PLAN_CACHE_SIZE shapes.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from pymongo import monitoring
+
+logger = logging.getLogger("slow_query")
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+SLOW_QUERY_SAMPLE_RATE = float(os.environ.get("SLOW_QUERY_SAMPLE_RATE", 1.0))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_EXPLAIN_TTL = float(os.environ.get("SLOW_QUERY_EXPLAIN_TTL", 600))
+SLOW_QUERY_PLAN_CACHE_SIZE = int(os.environ.get("SLOW_QUERY_PLAN_CACHE_SIZE", 256))
+
+# Commands that have a query plan worth explaining
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Session and transport fields the driver adds, not accepted inside explain
+DRIVER_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+def query_shape(value: Any) -> Any:
+    """Value with literals replaced by "?", keeping field names and operators.
+
+    Lists of literals, such as $in values, collapse to ["?"] whatever their length.
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if not any(isinstance(item, (dict, list, tuple)) for item in value):
+            return ["?"]
+        return [query_shape(item) for item in value]
+    return "?"
+
+def command_shape(command: dict) -> dict:
+    """The parts of a command that decide its plan"""
+    fields = ("filter", "sort", "query", "pipeline", "key", "updates", "deletes", "hint")
+    shape = {name: query_shape(command[name]) for name in fields if name in command}
+    # Bulk writes are shaped by their first statement, not by how many they carry
+    for name in ("updates", "deletes"):
+        if command.get(name):
+            shape[name] = [query_shape(command[name][0])]
+    # Sort and hint specs are shape, not values
+    for name in ("sort", "hint"):
+        if name in command:
+            shape[name] = command[name]
+    return shape
+
+def plan_summary(explain: dict) -> dict:
+    """Stages and index names of every winning plan in an explain result"""
+    stages: List[str] = []
+    indexes: List[str] = []
+
+    def walk(node: Any, in_plan: bool):
+        if isinstance(node, dict):
+            if in_plan and "stage" in node:
+                stages.append(node["stage"])
+                if "indexName" in node:
+                    indexes.append(node["indexName"])
+            for key, value in node.items():
+                walk(value, in_plan or key == "winningPlan")
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, in_plan)
+
+    walk(explain, False)
+    if "COLLSCAN" in stages:
+        scan = "COLLSCAN"
+    elif indexes:
+        scan = "IXSCAN"
+    else:
+        scan = stages[0] if stages else "UNKNOWN"
+    return {"scan": scan, "stages": stages, "indexes": sorted(set(indexes))}
+
+class SlowQueryLog(monitoring.CommandListener):
+    """Logs slow commands, explaining a sample of them on the event loop"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple, Tuple[str, dict]] = {}
+        self._plans: Dict[str, Tuple[float, dict]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._tasks = set()
+        self.logged = 0
+
+    def bind(self, client, loop: asyncio.AbstractEventLoop):
+        """Client and loop used to run explain, set once connected"""
+        self._client = client
+        self._loop = loop
+
+    def started(self, event):
+        if event.command_name in EXPLAINABLE:
+            with self._lock:
+                self._pending[(event.connection_id, event.request_id)] = (event.database_name, event.command)
+
+    def _finished(self, event) -> Optional[Tuple[str, dict]]:
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), None)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def succeeded(self, event):
+        pending = self._finished(event)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < SLOW_QUERY_MS or random.random() >= SLOW_QUERY_SAMPLE_RATE:
+            return
+        database_name, command = pending
+        entry = {
+            "event": "slow_query",
+            "database": database_name,
+            "collection": command.get(event.command_name),
+            "command": event.command_name,
+            "duration_ms": round(duration_ms, 3),
+            "shape": command_shape(command),
+        }
+        if SLOW_QUERY_EXPLAIN and self._loop is not None and not self._loop.is_closed():
+            # Listeners run on driver threads, explain belongs on the loop
+            self._loop.call_soon_threadsafe(self._spawn, entry, command)
+        else:
+            self.emit(entry)
+
+    def _spawn(self, entry: dict, command: dict):
+        task = asyncio.ensure_future(self.explain_and_log(entry, command))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def explain_and_log(self, entry: dict, command: dict):
+        key = json.dumps([entry["collection"], entry["command"], entry["shape"]], sort_keys=True, default=str)
+        cached = self._plans.get(key)
+        if cached and time.monotonic() - cached[0] < SLOW_QUERY_EXPLAIN_TTL:
+            entry["plan"] = cached[1]
+        else:
+            try:
+                explained = await self._client[entry["database"]].command(
+                    {"explain": self.explainable(command), "verbosity": "queryPlanner"}
+                )
+                entry["plan"] = plan_summary(explained)
+                self.remember_plan(key, entry["plan"])
+            except Exception as e:
+                entry["plan_error"] = str(e)
+        self.emit(entry)
+
+    def remember_plan(self, key: str, plan: dict):
+        """Cache a plan, dropping the oldest ones beyond SLOW_QUERY_PLAN_CACHE_SIZE"""
+        self._plans.pop(key, None)
+        self._plans[key] = (time.monotonic(), plan)
+        while len(self._plans) > SLOW_QUERY_PLAN_CACHE_SIZE:
+            del self._plans[next(iter(self._plans))]
+
+    @staticmethod
+    def explainable(command: dict) -> dict:
+        return {
+            key: value for key, value in command.items()
+            if not key.startswith("$") and key not in DRIVER_FIELDS
+        }
+
+    def emit(self, entry: dict):
+        self.logged += 1
+        logger.warning(json.dumps(entry, default=str, ensure_ascii=False))
+
+slow_query_log = SlowQueryLog()
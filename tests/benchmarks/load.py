@@ -0,0 +1,211 @@
+"""
+Concurrent load test of every API router
+
+Boots server.py with its lifespan (connect, seed, background workers) against
+mongomock-motor, or a real mongod with --mongo-url, scales bookings and
+contact messages up with data_generator, then drives each endpoint with
+concurrent in-process clients and reports latency percentiles and
+requests/sec per endpoint.
+
+mongomock scans, sorts and checks unique indexes in Python, so row counts
+default to 2,000 there and 100,000 against mongod; 10^6 needs a real mongod.
+
+Usage: python -m tests.benchmarks.load [--tours 20] [--bookings N] [--contacts N]
+           [--requests 200] [--concurrency 16] [--mongo-url mongodb://localhost:27017]
+           [--only bookings] [--save results.json] [--baseline results.json]
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+BACKEND = ROOT / "backend"
+
+Request = Tuple[str, str, Optional[dict]]
+
+def load_server(mongo_url: Optional[str], db_name: str):
+    """Import server.py with Mongo pointed at the stand-in.
+
+    server.py imports backend modules top level while the routers import them
+    relative to the backend package, so each module is registered under both
+    names to keep a single Database and cache instance.
+    """
+    os.environ["MONGO_URL"] = mongo_url or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = db_name
+    # Every simulated client posts from its own address
+    os.environ.setdefault("TRUST_PROXY_HEADERS", "true")
+    sys.path[:0] = [str(ROOT), str(BACKEND)]
+
+    for path in sorted(BACKEND.glob("*.py")):
+        if path.stem != "server":
+            sys.modules["backend." + path.stem] = importlib.import_module(path.stem)
+    for path in sorted((BACKEND / "routes").glob("*.py")):
+        if path.stem != "__init__":
+            importlib.import_module("backend.routes." + path.stem)
+    sys.modules["routes"] = sys.modules["backend.routes"]
+
+    database = sys.modules["database"]
+    if mongo_url is None:
+        import mongomock_motor
+        database.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+        # There are no secondaries to route reads to
+        mongomock_motor.AsyncMongoMockCollection.with_options = lambda self, **options: self
+    return importlib.import_module("server"), database
+
+async def scale_data(tours: int, bookings: int, contacts: int) -> Tuple[List[str], List[str]]:
+    """Add synthetic rows, return every tour id and the ids of tours without a capacity"""
+    from data_generator import generate
+    from database import tours_crud
+
+    started = time.perf_counter()
+    await generate(tours=tours, bookings=bookings, contacts=contacts)
+    print(f"Inserted {bookings} bookings and {contacts} contacts in {time.perf_counter() - started:.1f}s")
+    stored = await tours_crud.get_all()
+    return [tour["id"] for tour in stored], [tour["id"] for tour in stored if tour.get("capacity") is None]
+
+def endpoints(tour_ids: List[str], open_tour_ids: List[str]) -> Dict[str, Callable[[], Request]]:
+    """Endpoint name to a factory of (method, path, json body).
+
+    Bookings go to tours without a capacity, which never sell out.
+    """
+    def booking_body() -> dict:
+        return {
+            "tour_id": random.choice(open_tour_ids),
+            "first_name": "Нагрузка",
+            "last_name": "Тест",
+            "email": f"load{random.randint(0, 10**9)}@example.com",
+            "phone": "+34 600 000 000",
+            "country": "Испания",
+            "participants": random.randint(1, 4),
+        }
+
+    def contact_body() -> dict:
+        return {"name": "Нагрузка", "email": "load@example.com", "subject": "Тест", "message": "Сообщение"}
+
+    return {
+        "GET /api/tours/": lambda: ("GET", "/api/tours/", None),
+        "GET /api/tours/{id}": lambda: ("GET", f"/api/tours/{random.choice(tour_ids)}", None),
+        "GET /api/tours/page": lambda: ("GET", "/api/tours/page", None),
+        "GET /api/tours/{id}/availability": lambda: ("GET", f"/api/tours/{random.choice(tour_ids)}/availability", None),
+        "GET /api/coaches/": lambda: ("GET", "/api/coaches/", None),
+        "GET /api/testimonials/": lambda: ("GET", "/api/testimonials/", None),
+        "GET /api/gallery/": lambda: ("GET", "/api/gallery/", None),
+        "GET /api/settings/": lambda: ("GET", "/api/settings/", None),
+        "GET /api/home/": lambda: ("GET", "/api/home/", None),
+        "GET /api/bookings/": lambda: ("GET", "/api/bookings/?limit=50", None),
+        "GET /api/bookings/?status": lambda: ("GET", "/api/bookings/?status=confirmed&limit=50", None),
+        "GET /api/bookings/page": lambda: ("GET", "/api/bookings/page?limit=50", None),
+        "GET /api/bookings/stats": lambda: ("GET", "/api/bookings/stats", None),
+        "POST /api/bookings/": lambda: ("POST", "/api/bookings/", booking_body()),
+        "GET /api/contact/": lambda: ("GET", "/api/contact/?limit=50", None),
+        "GET /api/contact/page": lambda: ("GET", "/api/contact/page?limit=50&unread_only=true", None),
+        "POST /api/contact/": lambda: ("POST", "/api/contact/", contact_body()),
+    }
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+async def drive(client, make_request: Callable[[], Request], total: int, concurrency: int) -> dict:
+    """Send total requests from concurrency workers, return latency figures"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, body = make_request()
+            headers = {"X-Forwarded-For": f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"}
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Endpoints whose p95 grew beyond tolerance times the baseline"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before and before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * tolerance:
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+    return regressions
+
+async def run(args) -> Dict[str, dict]:
+    import httpx
+
+    server, database = load_server(args.mongo_url, args.db_name)
+    app = server.app
+    async with app.router.lifespan_context(app):
+        tour_ids, open_tour_ids = await scale_data(args.tours, args.bookings, args.contacts)
+        transport = httpx.ASGITransport(app=app)
+        results = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name, make_request in endpoints(tour_ids, open_tour_ids).items():
+                if args.only and args.only not in name:
+                    continue
+                # Warm caches and code paths before measuring
+                await drive(client, make_request, min(args.concurrency, args.requests), args.concurrency)
+                results[name] = await drive(client, make_request, args.requests, args.concurrency)
+        if args.mongo_url:
+            await database.Database.client.drop_database(args.db_name)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tours", type=int, default=20, help="synthetic tours without a capacity to add")
+    parser.add_argument("--bookings", type=int, help="synthetic bookings to add")
+    parser.add_argument("--contacts", type=int, help="synthetic contact messages to add")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mongo-url", help="use a real mongod instead of mongomock-motor")
+    parser.add_argument("--db-name", default=f"benchmark_{uuid.uuid4().hex[:8]}")
+    parser.add_argument("--only", help="run endpoints whose name contains this text")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="fail when p95 regresses against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed p95 growth over the baseline")
+    args = parser.parse_args()
+    default_rows = 100000 if args.mongo_url else 2000
+    args.bookings = default_rows if args.bookings is None else args.bookings
+    args.contacts = default_rows if args.contacts is None else args.contacts
+
+    results = asyncio.run(run(args))
+
+    print(f"\n{'endpoint':32} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:32} {r['requests']:6} {r['errors']:6} {r['rps']:9} {r['p50_ms']:9} {r['p95_ms']:9} {r['p99_ms']:9}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
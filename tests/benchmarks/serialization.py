@@ -0,0 +1,104 @@
+"""
+Per-request CPU cost of list serialization
+
+Compares the default FastAPI path (response_model validation + stdlib JSON)
+with the fast response path (direct encoding, cached bytes).
+
+Usage: python -m tests.benchmarks.serialization [--rows 500] [--iterations 200]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models import Booking, GalleryItem
+from responses import dumps
+
+def make_gallery(rows: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "image": f"https://images.unsplash.com/photo-{i}?crop=entropy&cs=srgb&fm=jpg&q=85",
+            "title": f"Тренировка на корте {i}",
+            "category": "training",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(rows)
+    ]
+
+def make_bookings(rows: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "tour_id": "1",
+            "first_name": "Иван",
+            "last_name": f"Петров {i}",
+            "email": f"guest{i}@example.com",
+            "phone": "+34 123 456 789",
+            "country": "Испания",
+            "participants": 2,
+            "special_requests": "Вегетарианское питание",
+            "total_price": 3800.0,
+            "status": "pending",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(rows)
+    ]
+
+async def model_path(field, docs: List[dict]) -> bytes:
+    content = await serialize_response(field=field, response_content=docs)
+    return JSONResponse(content).body
+
+async def fast_path(docs: List[dict]) -> bytes:
+    return dumps(docs)
+
+def cpu_per_request(run, iterations: int) -> float:
+    """Average process CPU time per call in milliseconds"""
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+        start = time.process_time()
+        for _ in range(iterations):
+            loop.run_until_complete(run())
+        return (time.process_time() - start) / iterations * 1000
+    finally:
+        loop.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, model, docs in (
+        ("gallery", GalleryItem, make_gallery(args.rows)),
+        ("bookings", Booking, make_bookings(args.rows)),
+    ):
+        field = create_response_field(name=f"Response_{name}", type_=List[model])
+        cached = dumps(docs)
+
+        before = cpu_per_request(lambda: model_path(field, docs), args.iterations)
+        after = cpu_per_request(lambda: fast_path(docs), args.iterations)
+        reused = cpu_per_request(lambda: asyncio.sleep(0, cached), args.iterations)
+
+        print(f"{name} ({args.rows} rows)")
+        print(f"  response_model + json:  {before:8.3f} ms/request")
+        print(f"  fast encoder:           {after:8.3f} ms/request ({before / after:.1f}x)")
+        print(f"  cached bytes:           {reused:8.3f} ms/request")
+
+if __name__ == "__main__":
+    main()
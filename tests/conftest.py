@@ -0,0 +1,35 @@
+"""
+Shared fixtures
+
+The app is loaded the way the load benchmark loads it, against
+mongomock-motor, and each test gets its own database and an empty cache.
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from tests.benchmarks.load import load_server
+
+@pytest.fixture(scope="session")
+def server():
+    server, _ = load_server(None, "test")
+    return server
+
+@pytest.fixture
+def run_app(server, monkeypatch):
+    """Run scenario(client) against the started app with a fresh database"""
+    import httpx
+
+    monkeypatch.setenv("DB_NAME", f"test_{uuid.uuid4().hex[:8]}")
+
+    def run(scenario):
+        async def main():
+            server.catalog_cache.clear()
+            async with server.app.router.lifespan_context(server.app):
+                transport = httpx.ASGITransport(app=server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await scenario(client)
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,29 @@
+
+def test_catalog_list_is_compressed(run_app):
+    async def scenario(client):
+        return await client.get("/api/tours/", headers={"Accept-Encoding": "gzip"})
+
+    response = run_app(scenario)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert len(response.json()) == 3
+
+def test_compressed_body_survives_conditional_middleware(run_app):
+    async def scenario(client):
+        raw = await client.get("/api/coaches/", headers={"Accept-Encoding": "identity"})
+        compressed = await client.get("/api/coaches/", headers={"Accept-Encoding": "gzip"})
+        return raw, compressed
+
+    raw, compressed = run_app(scenario)
+    assert "content-encoding" not in raw.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.content == raw.content
+
+def test_small_responses_are_not_compressed(run_app):
+    async def scenario(client):
+        return await client.get("/api/", headers={"Accept-Encoding": "gzip"})
+
+    response = run_app(scenario)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,29 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+def test_if_modified_since_sees_deletes(run_app):
+    import database
+
+    async def scenario(client):
+        # Last write an hour ago, so the delete falls in a later second of Last-Modified
+        hour_ago = datetime.utcnow() - timedelta(hours=1)
+        await database.tours_crud.collection.update_many({}, {"$set": {"updated_at": hour_ago}})
+        database.tours_crud.invalidate_cache()
+        first = await client.get("/api/tours/")
+        deleted = await client.delete(f"/api/tours/{first.json()[-1]['id']}")
+        second = await client.get("/api/tours/", headers={"If-Modified-Since": first.headers["last-modified"]})
+        return first, deleted.status_code, second
+
+    first, deleted, second = run_app(scenario)
+    assert deleted == 200
+    assert second.status_code == 200
+    assert len(second.json()) == len(first.json()) - 1
+    assert second.headers["last-modified"] != first.headers["last-modified"]
+
+def test_if_modified_since_unchanged_collection(run_app):
+    async def scenario(client):
+        first = await client.get("/api/tours/")
+        since = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=1), usegmt=True)
+        return await client.get("/api/tours/", headers={"If-Modified-Since": since})
+
+    assert run_app(scenario).status_code == 304
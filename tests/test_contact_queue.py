@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+MESSAGE = {"name": "Анна", "email": "anna@example.com", "subject": "Тур", "message": "Есть места?"}
+
+def flaky_create_many(database, monkeypatch, failures: int):
+    original = database.contacts_crud.create_many
+    calls = {"count": 0}
+
+    async def create_many(docs):
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            raise RuntimeError("primary stepped down")
+        return await original(docs)
+
+    monkeypatch.setattr(database.contacts_crud, "create_many", create_many)
+    return calls
+
+def test_failed_batch_is_retried_not_dropped(run_app, monkeypatch):
+    import contact_queue
+    import database
+
+    monkeypatch.setattr(contact_queue, "CONTACT_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(contact_queue.contact_queue, "flush_interval", 0.01)
+
+    before = contact_queue.contact_queue.stats()
+
+    async def scenario(client):
+        flaky_create_many(database, monkeypatch, failures=2)
+        response = await client.post("/api/contact/", json=MESSAGE)
+        for _ in range(100):
+            if contact_queue.contact_queue.written > before["written"]:
+                break
+            await asyncio.sleep(0.01)
+        stored = await database.contacts_crud.collection.count_documents({"email": MESSAGE["email"]})
+        return response.status_code, stored, contact_queue.contact_queue.stats()
+
+    status, stored, stats = run_app(scenario)
+    assert status == 200
+    assert stored == 1
+    assert stats["written"] - before["written"] == 1
+    assert stats["failed"] == before["failed"]
+    assert stats["retries"] - before["retries"] == 2
+    assert not stats["failing"]
+
+def test_messages_are_written_directly_while_the_queue_is_failing(run_app, monkeypatch):
+    import contact_queue
+    import database
+
+    async def scenario(client):
+        monkeypatch.setattr(contact_queue.contact_queue, "failing", True)
+        flaky_create_many(database, monkeypatch, failures=0)
+
+        async def failing_create(data, session=None):
+            raise RuntimeError("primary stepped down")
+
+        monkeypatch.setattr(database.contacts_crud, "create", failing_create)
+        response = await client.post("/api/contact/", json=MESSAGE)
+        monkeypatch.setattr(contact_queue.contact_queue, "failing", False)
+        return response.status_code
+
+    assert run_app(scenario) == 500
+
+def test_stop_logs_messages_it_cannot_store(run_app, monkeypatch, caplog):
+    import contact_queue
+    import database
+
+    monkeypatch.setattr(contact_queue, "CONTACT_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(contact_queue.contact_queue, "flush_interval", 0.01)
+    failed = contact_queue.contact_queue.failed
+
+    async def scenario(client):
+        flaky_create_many(database, monkeypatch, failures=1000)
+        return await client.post("/api/contact/", json=MESSAGE)
+
+    with caplog.at_level(logging.ERROR, logger="contact_queue"):
+        response = run_app(scenario)
+    assert response.status_code == 200
+    assert contact_queue.contact_queue.failed - failed == 1
+    assert any("Contact message not stored" in record.message and "Есть места?" in record.message for record in caplog.records)
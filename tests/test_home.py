@@ -0,0 +1,18 @@
+def test_home_if_none_match(run_app):
+    async def scenario(client):
+        first = await client.get("/api/home/")
+        etag = first.headers["etag"]
+        statuses = {}
+        for name, value in {
+            "same": etag,
+            "listed": f'"other", {etag}',
+            "strong": etag.removeprefix("W/"),
+            "any": "*",
+            "prefix": etag[:-3] + '"',
+            "unrelated": '"other"',
+        }.items():
+            statuses[name] = (await client.get("/api/home/", headers={"If-None-Match": value})).status_code
+        return statuses
+
+    statuses = run_app(scenario)
+    assert statuses == {"same": 304, "listed": 304, "strong": 304, "any": 304, "prefix": 200, "unrelated": 200}
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+def test_not_modified_keeps_route_label(run_app):
+    async def scenario(client):
+        await client.get("/api/tours/")
+        since = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=1), usegmt=True)
+        cached = await client.get("/api/tours/", headers={"If-Modified-Since": since})
+        return cached.status_code, (await client.get("/api/metrics")).text
+
+    status, metrics = run_app(scenario)
+    assert status == 304
+    assert 'route="/api/tours/",status="304"' in metrics
+
+def test_get_more_labelled_with_collection():
+    import metrics
+
+    command_metrics = metrics.MongoCommandMetrics()
+    event = SimpleNamespace(
+        command_name="getMore", command={"getMore": 42, "collection": "bookings"},
+        connection_id=("localhost", 27017), request_id=1, duration_micros=1500
+    )
+    command_metrics.started(event)
+    command_metrics.succeeded(event)
+    assert 'collection="bookings",command="getMore"' in "\n".join(metrics.mongo_command_duration.render())
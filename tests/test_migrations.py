@@ -0,0 +1,24 @@
+from datetime import datetime
+
+def test_startup_backfill_runs_once(run_app):
+    import database
+
+    async def scenario(client):
+        migrations = database.get_database()[database.MIGRATIONS_COLLECTION]
+        recorded = await migrations.find_one({"_id": "backfill_ids"})
+        legacy = await database.contacts_crud.collection.insert_one({
+            "name": "Legacy", "email": "legacy@example.com", "subject": "Hello", "message": "Stored before ids",
+            "read": False, "created_at": datetime.utcnow()
+        })
+        skipped = not await database.run_migration("backfill_ids", database.backfill_ids)
+        before = await database.contacts_crud.collection.find_one({"_id": legacy.inserted_id})
+        forced = await database.run_migration("backfill_ids", database.backfill_ids, force=True)
+        found = await client.get(f"/api/contact/{legacy.inserted_id}")
+        return recorded, skipped, before, forced, found, str(legacy.inserted_id)
+
+    recorded, skipped, before, forced, found, legacy_id = run_app(scenario)
+    assert recorded is not None
+    assert skipped and "id" not in before
+    assert forced
+    assert found.status_code == 200
+    assert found.json()["id"] == legacy_id
@@ -0,0 +1,34 @@
+import pytest
+
+@pytest.mark.parametrize("display, expected", [
+    ("от 1900", 1900.0),
+    ("1 900,50 €", 1900.5),
+    ("1,900", 1900.0),
+    ("1.900", 1900.0),
+    ("1.900.000", 1900000.0),
+    ("1,900.50", 1900.5),
+    ("1.900,5", 1900.5),
+    ("1900,5", 1900.5),
+])
+def test_parse_price(server, display, expected):
+    from pricing import parse_price
+
+    assert parse_price(display) == expected
+
+@pytest.mark.parametrize("display", ["договорная", "1900.5.5", "1,90,0", "1.900,000.5"])
+def test_parse_price_rejects_malformed_prices(server, display):
+    from pricing import parse_price
+
+    with pytest.raises(ValueError):
+        parse_price(display)
+
+def test_tour_price_with_thousands_separator(run_app):
+    async def scenario(client):
+        tours = (await client.get("/api/tours/")).json()
+        updated = await client.put(f"/api/tours/{tours[0]['id']}", json={"price": "от 1,900"})
+        malformed = await client.put(f"/api/tours/{tours[0]['id']}", json={"price": "от 1.900,000.5"})
+        return updated, malformed
+
+    updated, malformed = run_app(scenario)
+    assert updated.json()["base_price"] == 1900.0
+    assert malformed.status_code == 400
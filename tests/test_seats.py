@@ -0,0 +1,202 @@
+import asyncio
+
+import pytest
+
+TOUR = {
+    "title": "Тур", "subtitle": "Тенерифе", "dates": "04.06.27 - 11.06.27", "level": "начинающие",
+    "accommodation": "Отель", "price": "от 1000", "description": "Описание", "image": "image.jpg",
+    "features": ["Тренировки"], "group_size": "8-12 человек",
+}
+
+def booking(tour_id: str, participants: int = 1) -> dict:
+    return {
+        "tour_id": tour_id, "first_name": "Анна", "last_name": "Иванова", "email": "anna@example.com",
+        "phone": "+7 900 000 00 00", "country": "Россия", "participants": participants,
+    }
+
+async def create_tour(client, capacity=None) -> str:
+    response = await client.post("/api/tours/", json={**TOUR, "capacity": capacity})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+async def availability(client, tour_id: str) -> dict:
+    response = await client.get(f"/api/tours/{tour_id}/availability")
+    assert response.status_code == 200
+    return response.json()
+
+def test_concurrent_bookings_never_oversell(run_app):
+    async def scenario(client):
+        tour_id = await create_tour(client, capacity=10)
+        responses = await asyncio.gather(*(client.post("/api/bookings/", json=booking(tour_id)) for _ in range(30)))
+        return [response.status_code for response in responses], await availability(client, tour_id)
+
+    codes, seats = run_app(scenario)
+    assert codes.count(200) == 10
+    assert codes.count(409) == 20
+    assert seats == {"tour_id": seats["tour_id"], "capacity": 10, "seats_taken": 10, "seats_left": 0, "available": False}
+
+def test_concurrent_first_bookings_start_one_counter(run_app):
+    async def scenario(client):
+        tour_id = await create_tour(client, capacity=7)
+        responses = await asyncio.gather(*(client.post("/api/bookings/", json=booking(tour_id, 2)) for _ in range(10)))
+        return [response.status_code for response in responses], await availability(client, tour_id)
+
+    codes, seats = run_app(scenario)
+    assert codes.count(200) == 3
+    assert seats["seats_taken"] == 6
+
+def test_cancel_releases_and_reactivation_reserves(run_app):
+    async def scenario(client):
+        tour_id = await create_tour(client, capacity=4)
+        first = (await client.post("/api/bookings/", json=booking(tour_id, 3))).json()
+        cancel = await client.put(f"/api/bookings/{first['id']}/status", json={"status": "cancelled"})
+        after_cancel = await availability(client, tour_id)
+        await client.put(f"/api/bookings/{first['id']}/status", json={"status": "cancelled"})
+        after_second_cancel = await availability(client, tour_id)
+        await client.post("/api/bookings/", json=booking(tour_id, 2))
+        reactivate = await client.put(f"/api/bookings/{first['id']}/status", json={"status": "confirmed"})
+        return cancel.status_code, after_cancel, after_second_cancel, reactivate.status_code, await availability(client, tour_id)
+
+    cancel, after_cancel, after_second_cancel, reactivate, final = run_app(scenario)
+    assert cancel == 200
+    assert after_cancel["seats_taken"] == 0
+    assert after_second_cancel["seats_taken"] == 0
+    assert reactivate == 409
+    assert final["seats_taken"] == 2
+
+def test_moving_a_booking_transfers_seats(run_app):
+    async def scenario(client):
+        source = await create_tour(client, capacity=5)
+        target = await create_tour(client, capacity=5)
+        created = (await client.post("/api/bookings/", json=booking(source, 3))).json()
+        moved = await client.put(f"/api/bookings/{created['id']}", json={"tour_id": target})
+        grown = await client.put(f"/api/bookings/{created['id']}", json={"participants": 6})
+        return moved.status_code, grown.status_code, await availability(client, source), await availability(client, target)
+
+    moved, grown, source, target = run_app(scenario)
+    assert moved == 200
+    assert grown == 409
+    assert source["seats_taken"] == 0
+    assert target["seats_taken"] == 3
+
+def test_delete_releases_seats(run_app):
+    async def scenario(client):
+        tour_id = await create_tour(client, capacity=5)
+        created = (await client.post("/api/bookings/", json=booking(tour_id, 4))).json()
+        deleted = await client.delete(f"/api/bookings/{created['id']}")
+        return deleted.status_code, await availability(client, tour_id)
+
+    deleted, seats = run_app(scenario)
+    assert deleted == 200
+    assert seats["seats_taken"] == 0
+
+def test_bulk_reserves_per_tour_and_reports_rows_that_do_not_fit(run_app):
+    async def scenario(client):
+        full = await create_tour(client, capacity=10)
+        open_tour = await create_tour(client)
+        rows = [booking(full, 4), booking(open_tour, 6), booking(full, 4), booking(full, 4)]
+        result = (await client.post("/api/bookings/bulk", json=rows)).json()
+        return result, await availability(client, full), await availability(client, open_tour)
+
+    result, full, open_tour = run_app(scenario)
+    assert result["created"] == 3
+    assert [error["index"] for error in result["errors"]] == [3]
+    assert full["seats_taken"] == 8
+    assert open_tour == {**open_tour, "capacity": None, "seats_taken": 6, "available": True}
+
+def test_failed_outbox_write_takes_the_booking_back(run_app, monkeypatch):
+    import database
+
+    async def failing_enqueue(events, session=None):
+        raise RuntimeError("outbox unavailable")
+
+    async def scenario(client):
+        tour_id = await create_tour(client, capacity=5)
+        monkeypatch.setattr(database.outbox_crud, "enqueue", failing_enqueue)
+        response = await client.post("/api/bookings/", json=booking(tour_id, 2))
+        stored = await database.bookings_crud.collection.count_documents({"tour_id": tour_id})
+        stats = (await client.get("/api/bookings/stats")).json()
+        return response.status_code, stored, stats, await availability(client, tour_id)
+
+    status, stored, stats, seats = run_app(scenario)
+    assert status == 500
+    assert stored == 0
+    assert stats["by_tour"].get(seats["tour_id"], {"count": 0})["count"] == 0
+    assert seats["seats_taken"] == 0
+
+def test_availability_is_never_served_from_a_validator(run_app):
+    async def scenario(client):
+        tour_id = await create_tour(client, capacity=5)
+        tour = await client.get(f"/api/tours/{tour_id}")
+        first = await client.get(f"/api/tours/{tour_id}/availability")
+        await client.post("/api/bookings/", json=booking(tour_id, 2))
+        second = await client.get(
+            f"/api/tours/{tour_id}/availability", headers={"If-None-Match": tour.headers["etag"]}
+        )
+        return first, second
+
+    first, second = run_app(scenario)
+    assert first.headers["cache-control"] == "no-store"
+    assert "etag" not in first.headers
+    assert second.status_code == 200
+    assert second.json()["seats_taken"] == 2
+
+@pytest.mark.parametrize("bookings", [500])
+def test_generated_bookings_respect_capacity(run_app, bookings):
+    import database
+    from data_generator import generate
+
+    async def scenario(client):
+        await generate(tours=2, bookings=bookings)
+        tours = await database.tours_crud.collection.find({}, {"_id": 0, "id": 1, "capacity": 1}).to_list(length=None)
+        return tours, [await availability(client, tour["id"]) for tour in tours]
+
+    tours, seats = run_app(scenario)
+    limited = [entry for entry in seats if entry["capacity"] is not None]
+    assert limited
+    assert all(entry["seats_taken"] <= entry["capacity"] for entry in limited)
+
+def test_failed_bulk_insert_releases_seats(run_app, monkeypatch):
+    import database
+
+    async def failing_create_many(self, docs):
+        raise RuntimeError("connection reset")
+
+    async def scenario(client):
+        tour_id = await create_tour(client, capacity=10)
+        monkeypatch.setattr(database.BaseCRUD, "create_many", failing_create_many)
+        response = await client.post("/api/bookings/bulk", json=[booking(tour_id, 3), booking(tour_id, 3)])
+        return response.status_code, await availability(client, tour_id)
+
+    status, seats = run_app(scenario)
+    assert status == 500
+    assert seats["seats_taken"] == 0
+
+def test_generated_bookings_keep_status_mix(run_app):
+    import database
+    from data_generator import generate
+
+    async def scenario(client):
+        with pytest.raises(ValueError):
+            await generate(bookings=2000)
+        rejected = await database.bookings_crud.collection.count_documents({})
+        await generate(tours=2, bookings=2000)
+        cancelled = await database.bookings_crud.collection.count_documents({"status": "cancelled"})
+        return rejected, cancelled
+
+    rejected, cancelled = run_app(scenario)
+    assert rejected == 0
+    assert cancelled < 500
+
+def test_bulk_bookings_enqueue_notifications(run_app):
+    import database
+
+    async def scenario(client):
+        tour_id = await create_tour(client, capacity=4)
+        response = await client.post("/api/bookings/bulk", json=[booking(tour_id, 2), booking(tour_id, 2), booking(tour_id, 1)])
+        events = await database.outbox_crud.collection.find({}, {"_id": 0, "payload.booking_id": 1}).to_list(length=None)
+        return response.json(), events
+
+    result, events = run_app(scenario)
+    assert result["created"] == 2
+    assert sorted(event["payload"]["booking_id"] for event in events) == sorted(result["ids"] * 2)
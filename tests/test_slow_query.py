@@ -0,0 +1,16 @@
+def test_query_shape_ignores_list_lengths(server):
+    from slow_query import command_shape
+
+    assert command_shape({"find": "bookings", "filter": {"id": {"$in": ["a", "b", "c"]}}}) == \
+        command_shape({"find": "bookings", "filter": {"id": {"$in": ["d"]}}})
+    assert command_shape({"update": "tours", "updates": [{"q": {"id": "a"}, "u": {"$inc": {"n": 1}}}] * 3}) == \
+        command_shape({"update": "tours", "updates": [{"q": {"id": "b"}, "u": {"$inc": {"n": 2}}}]})
+
+def test_plan_cache_is_bounded(server, monkeypatch):
+    import slow_query
+
+    monkeypatch.setattr(slow_query, "SLOW_QUERY_PLAN_CACHE_SIZE", 3)
+    log = slow_query.SlowQueryLog()
+    for shape in range(10):
+        log.remember_plan(str(shape), {"scan": "COLLSCAN"})
+    assert list(log._plans) == ["7", "8", "9"]